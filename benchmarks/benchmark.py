@@ -0,0 +1,293 @@
+# -*- coding: utf-8 -*-
+"""
+Banc d'essai du résolveur, du générateur et du jeu, sur un corpus fixe (benchmarks/corpus.txt).
+
+Mesure, pour chaque scénario : le nombre de nœuds explorés, le temps (total, moyen, médian,
+90e et 99e centiles) et le pic de mémoire. Les résultats sont enregistrés en JSON pour pouvoir
+comparer deux exécutions :
+
+    python benchmarks/benchmark.py -o avant.json
+    ... modification du code ...
+    python benchmarks/benchmark.py -o apres.json
+    python benchmarks/benchmark.py --comparer avant.json apres.json
+
+La stratégie naïve n'est lancée par défaut que sur les ensembles "facile" et "moyen"
+(elle peut prendre plusieurs minutes sur les autres) : --naif-partout pour tout lancer.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main_propre import Grille, GenerateurSudoku, ResolveurSudoku, ResolveurDLX, Jeu, Instrumentation
+from corpus import lire_corpus
+
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus.txt")
+ENSEMBLES = ("facile", "moyen", "difficile", "adverse")
+MOTEURS = {
+    "mrv": lambda grille: ResolveurSudoku(grille, "mrv"),
+    "naif": lambda grille: ResolveurSudoku(grille, "naif"),
+    "dlx": ResolveurDLX,
+}
+DIFFICULTES = (30, 40, 50, 55)
+GRAINES = range(10)
+CIBLES = ("facile", "moyen", "difficile")
+GRAINES_CIBLES = range(3)
+
+
+def statistiques(durees, noeuds=None):
+    """
+    Résume une série de mesures
+
+    Parameters
+    ----------
+    durees : list[float]
+        Durées en secondes
+    noeuds : list[int], optional
+        Nombres de nœuds explorés
+
+    Returns
+    -------
+    dict
+        Nombre de mesures, temps total, moyen et centiles (en millisecondes), nœuds
+
+    """
+    ms = np.array(durees) * 1000
+    resultat = {
+        "nombre": len(durees),
+        "total_ms": float(ms.sum()),
+        "moyenne_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p90_ms": float(np.percentile(ms, 90)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "max_ms": float(ms.max()),
+    }
+    if noeuds is not None:
+        resultat["noeuds_total"] = int(sum(noeuds))
+        resultat["noeuds_max"] = int(max(noeuds))
+    return resultat
+
+def pic_memoire(fonction):
+    """
+    Exécute une fonction sous tracemalloc et rend son pic de mémoire (en Kio).
+    Mesuré dans une passe séparée, pour ne pas fausser les temps
+
+    """
+    tracemalloc.start()
+    try:
+        fonction()
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+def charger_corpus():
+    """
+    Lit le corpus fixe
+
+    Returns
+    -------
+    dict
+        Pour chaque ensemble, la liste des couples (nom, tableau de valeurs)
+
+    """
+    ensembles = {ensemble: [] for ensemble in ENSEMBLES}
+    for grille, (ensemble, nom) in lire_corpus(CORPUS):
+        ensembles[ensemble].append((nom, grille.grille))
+    return ensembles
+
+def bench_resolution(corpus, moteurs, naif_partout=False):
+    """
+    Mesure la résolution de chaque ensemble par chaque moteur
+
+    """
+    resultats = {}
+    for ensemble, puzzles in corpus.items():
+        resultats[ensemble] = {}
+        for nom_moteur in moteurs:
+            if nom_moteur == "naif" and ensemble not in ("facile", "moyen") and not naif_partout:
+                continue
+            fabrique = MOTEURS[nom_moteur]
+
+            def resoudre_tout(durees=None, noeuds=None):
+                for nom, valeurs in puzzles:
+                    resolveur = fabrique(Grille.depuis_tableau(valeurs.copy()))
+                    debut = time.perf_counter()
+                    if not resolveur.resoudre():
+                        raise RuntimeError(f"{nom} non résolu par {nom_moteur}")
+                    if durees is not None:
+                        durees.append(time.perf_counter() - debut)
+                        noeuds.append(resolveur.noeuds)
+
+            durees, noeuds = [], []
+            resoudre_tout(durees, noeuds)
+            resultats[ensemble][nom_moteur] = statistiques(durees, noeuds)
+            resultats[ensemble][nom_moteur]["pic_memoire_kio"] = pic_memoire(resoudre_tout)
+    return resultats
+
+def bench_generation(difficultes=DIFFICULTES, graines=GRAINES):
+    """
+    Mesure la génération à plusieurs difficultés, avec des graines fixes
+
+    """
+    resultats = {}
+    for difficulte in difficultes:
+        def generer_tout(durees=None, cases=None):
+            for graine in graines:
+                debut = time.perf_counter()
+                grille = GenerateurSudoku(difficulte, graine=graine).generer_grille()
+                if durees is not None:
+                    durees.append(time.perf_counter() - debut)
+                    cases.append(int((grille.grille == 0).sum()))
+
+        durees, cases = [], []
+        generer_tout(durees, cases)
+        resultats[str(difficulte)] = statistiques(durees)
+        resultats[str(difficulte)]["cases_retirees_moyenne"] = float(np.mean(cases))
+        resultats[str(difficulte)]["pic_memoire_kio"] = pic_memoire(generer_tout)
+        #Compteurs détaillés, dans une passe séparée (l'instrumentation a un petit coût)
+        instrumentation = Instrumentation()
+        for graine in graines:
+            GenerateurSudoku(difficulte, graine=graine, instrumentation=instrumentation).generer_grille()
+        compteurs = instrumentation.rapport()
+        temps = compteurs.pop("temps")
+        resultats[str(difficulte)]["compteurs"] = compteurs
+        resultats[str(difficulte)]["temps_phases_ms"] = {phase: 1000 * duree / len(graines) for phase, duree in temps.items()}
+    return resultats
+
+def bench_generation_cible(cibles=CIBLES, graines=GRAINES_CIBLES):
+    """
+    Mesure la génération avec une cible de difficulté, et vérifie que chaque puzzle a au moins
+    le nombre de cases vides par défaut du générateur (une cible facile ne doit pas donner une grille presque pleine)
+
+    Returns
+    -------
+    tuple(dict, list[str])
+        Résultats par cible et anomalies relevées
+
+    """
+    resultats, anomalies = {}, []
+    minimum = GenerateurSudoku.DIFFICULTES[9]
+    for cible in cibles:
+        durees, cases = [], []
+        for graine in graines:
+            debut = time.perf_counter()
+            grille = GenerateurSudoku(graine=graine, cible=cible).generer_grille()
+            durees.append(time.perf_counter() - debut)
+            cases.append(int((grille.grille == 0).sum()))
+            if cases[-1] < minimum:
+                anomalies.append(f"cible {cible}, graine {graine} : {cases[-1]} cases vides (au moins {minimum} attendues)")
+        resultats[cible] = statistiques(durees)
+        resultats[cible]["cases_retirees_min"] = min(cases)
+        resultats[cible]["cases_retirees_moyenne"] = float(np.mean(cases))
+    return resultats, anomalies
+
+def bench_jeu(corpus, repetitions=20):
+    """
+    Mesure le débit de Jeu.jouer_coup : on joue puis efface toute la solution de chaque puzzle "moyen",
+    en chronométrant chaque coup (l'affichage console est redirigé vers un tampon)
+
+    """
+    parties = []
+    for nom, valeurs in corpus["moyen"]:
+        solution = Grille.depuis_tableau(valeurs.copy())
+        ResolveurSudoku(solution).resoudre()
+        coups = [(ligne, colonne, int(solution.grille[ligne, colonne]))
+                 for ligne, colonne in np.argwhere(valeurs == 0).tolist()]
+        parties.append((valeurs, coups))
+
+    def jouer_tout(durees=None):
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(repetitions):
+                for valeurs, coups in parties:
+                    jeu = Jeu(valeurs.tolist())
+                    for ligne, colonne, valeur in coups + [(ligne, colonne, 0) for ligne, colonne, valeur in coups]:
+                        debut = time.perf_counter()
+                        jeu.jouer_coup(ligne, colonne, valeur)
+                        if durees is not None:
+                            durees.append(time.perf_counter() - debut)
+
+    durees = []
+    debut = time.perf_counter()
+    jouer_tout(durees)
+    total = time.perf_counter() - debut
+    resultat = statistiques(durees)
+    resultat["coups_par_seconde"] = 2 * sum(len(coups) for _, coups in parties) * repetitions / total
+    resultat["pic_memoire_kio"] = pic_memoire(jouer_tout)
+    return resultat
+
+def comparer(ancien, nouveau, seuil=0.10, chemin=""):
+    """
+    Compare deux résultats et affiche les écarts relatifs supérieurs au seuil
+
+    Returns
+    -------
+    int
+        Nombre de métriques en régression (temps, nœuds ou mémoire en hausse au-delà du seuil)
+
+    """
+    regressions = 0
+    for cle, valeur in ancien.items():
+        if cle not in nouveau or cle == "meta":
+            continue
+        nom = f"{chemin}/{cle}" if chemin else cle
+        if isinstance(valeur, dict):
+            regressions += comparer(valeur, nouveau[cle], seuil, nom)
+        elif isinstance(valeur, (int, float)) and valeur and cle != "nombre":
+            ecart = (nouveau[cle] - valeur) / valeur
+            if abs(ecart) > seuil:
+                #Pour le débit, une hausse est une amélioration
+                pire = ecart < 0 if cle == "coups_par_seconde" else ecart > 0
+                regressions += pire
+                print(f"{'REGRESSION ' if pire else 'amélioration'} {nom} : {valeur:.4g} -> {nouveau[cle]:.4g} ({ecart:+.1%})")
+    return regressions
+
+def main(arguments=None):
+    analyseur = argparse.ArgumentParser(description="Banc d'essai du sudoku")
+    analyseur.add_argument("-o", "--sortie", default=None, help="fichier JSON de résultats")
+    analyseur.add_argument("--moteurs", default="mrv,dlx,naif", help="moteurs de résolution à mesurer")
+    analyseur.add_argument("--naif-partout", action="store_true", help="lancer aussi le moteur naïf sur les ensembles difficiles")
+    analyseur.add_argument("--sans-generation", action="store_true", help="ne pas mesurer la génération")
+    analyseur.add_argument("--comparer", nargs=2, metavar=("ANCIEN", "NOUVEAU"), help="comparer deux fichiers de résultats")
+    analyseur.add_argument("--seuil", type=float, default=0.10, help="écart relatif signalé lors d'une comparaison")
+    options = analyseur.parse_args(arguments)
+
+    if options.comparer:
+        with open(options.comparer[0], encoding="utf-8") as fichier:
+            ancien = json.load(fichier)
+        with open(options.comparer[1], encoding="utf-8") as fichier:
+            nouveau = json.load(fichier)
+        regressions = comparer(ancien, nouveau, options.seuil)
+        print(f"\n{regressions} régression(s) au-delà de {options.seuil:.0%}")
+        return 1 if regressions else 0
+
+    corpus = charger_corpus()
+    resultats = {"meta": {"date": time.strftime("%Y-%m-%d %H:%M:%S"), "python": platform.python_version(),
+                          "numpy": np.__version__, "machine": platform.machine()}}
+    resultats["resolution"] = bench_resolution(corpus, options.moteurs.split(","), options.naif_partout)
+    anomalies = []
+    if not options.sans_generation:
+        resultats["generation"] = bench_generation()
+        resultats["generation_cible"], anomalies = bench_generation_cible()
+    resultats["jeu"] = bench_jeu(corpus)
+
+    texte = json.dumps(resultats, indent=2, ensure_ascii=False)
+    if options.sortie:
+        with open(options.sortie, "w", encoding="utf-8") as fichier:
+            fichier.write(texte + "\n")
+    print(texte)
+    for anomalie in anomalies:
+        print(f"Anomalie : {anomalie}", file=sys.stderr)
+    return 1 if anomalies else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,348 @@
+# -*- coding: utf-8 -*-
+"""
+Forme canonique des puzzles et index de hachage pour les dédoublonner.
+
+Deux puzzles sont équivalents si l'on passe de l'un à l'autre par les symétries du sudoku
+(voir symetries.py) : renommage des chiffres, permutations des lignes dans les bandes et des bandes,
+des colonnes dans les piles et des piles, transposition. La forme canonique est le plus petit
+représentant (dans l'ordre lexicographique de la grille lue ligne par ligne) de la classe d'un puzzle.
+
+Pour un ordre des cases fixé, le meilleur renommage des chiffres est toujours de les numéroter
+par ordre de première apparition. On construit donc la forme canonique ligne par ligne, en gardant
+toutes les transformations ex æquo (séparation et évaluation), de manière vectorisée avec NumPy.
+Sur une grille creuse, les ex æquo se comptent par millions : les transformations qui laissent
+la même grille restante (mêmes lignes à placer, mêmes chiffres déjà renommés) donnent forcément
+la même suite, et une seule d'entre elles est gardée.
+
+Dédoublonnage d'un corpus en flux, avec un index de taille fixe (éventuellement sur disque) :
+    python canonique.py puzzles.txt uniques.txt [index.idx]
+"""
+
+import hashlib
+import itertools
+import math
+import os
+import struct
+import sys
+import numpy as np
+
+
+SIGNATURE = b"SDKH"
+VERSION = 1
+_ENTETE = struct.Struct("<4sHxxQQ")
+#Au-delà de ce taux de remplissage, le sondage linéaire devient lent
+TAUX_MAXIMAL = 0.75
+#Au-delà, le nombre de permutations des colonnes explose
+TAILLE_MAXIMALE = 9
+
+#Nombre d'états au-delà duquel on fusionne les états équivalents (en dessous, le tri coûte plus qu'il ne rapporte)
+ETATS_FUSION = 16384
+
+_PERMUTATIONS = {}
+
+
+def _permutations_colonnes(taille):
+    #Toutes les permutations des colonnes qui respectent les piles (mises en cache par taille)
+    if taille not in _PERMUTATIONS:
+        n = math.isqrt(taille)
+        internes = list(itertools.permutations(range(n)))
+        permutations = []
+        for piles in itertools.permutations(range(n)):
+            for choix in itertools.product(internes, repeat=n):
+                permutations.append([n * pile + colonne for pile, ordre in zip(piles, choix) for colonne in ordre])
+        _PERMUTATIONS[taille] = np.array(permutations, dtype=np.intp)
+    return _PERMUTATIONS[taille]
+
+def forme_canonique(valeurs):
+    """
+    Calcule la forme canonique d'un puzzle
+
+    Parameters
+    ----------
+    valeurs : np.ndarray
+        Grille (taille, taille), 0 pour les cases vides. Tailles acceptées : 4 et 9
+
+    Returns
+    -------
+    np.ndarray
+        Plus petit représentant de la classe du puzzle, de forme (taille, taille)
+
+    Raises
+    ------
+    ValueError
+        Si la grille est trop grande (le nombre de permutations des colonnes explose au-delà de 9x9)
+
+    """
+    valeurs = np.asarray(valeurs, dtype=np.uint8)
+    taille = len(valeurs)
+    if taille > TAILLE_MAXIMALE:
+        raise ValueError(f"Forme canonique disponible jusqu'aux grilles {TAILLE_MAXIMALE}x{TAILLE_MAXIMALE} "
+                         f"(reçu : {taille}x{taille})")
+    n = math.isqrt(taille)
+    grilles = np.stack([valeurs, valeurs.T])
+    colonnes = _permutations_colonnes(taille)
+    poids = 10 ** np.arange(taille - 1, -1, -1, dtype=np.int64)
+
+    #États : (grille d'origine ou transposée, ordre des colonnes, lignes déjà choisies, renommage)
+    etat_grille = np.repeat(np.arange(2), len(colonnes))
+    etat_colonnes = np.tile(colonnes, (2, 1))
+    etat_lignes = np.zeros((len(etat_grille), 0), dtype=np.intp)
+    etat_noms = np.zeros((len(etat_grille), taille + 1), dtype=np.uint8)
+    etat_suivant = np.ones(len(etat_grille), dtype=np.uint8)
+
+    for ligne_sortie in range(taille):
+        #Lignes candidates : n'importe quelle ligne d'une bande pas encore utilisée en début de bande,
+        #sinon une ligne pas encore utilisée de la bande en cours
+        candidats = []
+        for ligne in range(taille):
+            if ligne_sortie % n == 0:
+                possible = ~(etat_lignes // n == ligne // n).any(axis=1)
+            else:
+                possible = (etat_lignes[:, -1] // n == ligne // n) & ~(etat_lignes == ligne).any(axis=1)
+            candidats.append(np.flatnonzero(possible))
+        origine = np.concatenate(candidats)
+        lignes = np.concatenate([np.full(len(indices), ligne, dtype=np.intp) for ligne, indices in enumerate(candidats)])
+
+        #Valeurs de la ligne dans l'ordre des colonnes, renommées par ordre de première apparition
+        rangee = grilles[etat_grille[origine][:, None], lignes[:, None], etat_colonnes[origine]]
+        noms = etat_noms[origine]
+        suivant = etat_suivant[origine]
+        indices = np.arange(len(origine))
+        renommee = np.empty_like(rangee)
+        for colonne in range(taille):
+            chiffre = rangee[:, colonne]
+            nom = noms[indices, chiffre]
+            nouveau = (chiffre != 0) & (nom == 0)
+            noms[indices[nouveau], chiffre[nouveau]] = suivant[nouveau]
+            nom[nouveau] = suivant[nouveau]
+            suivant[nouveau] += 1
+            renommee[:, colonne] = nom
+
+        #On ne garde que les états qui donnent la plus petite ligne
+        cles = renommee @ poids
+        gardes = cles == cles.min()
+        origine = origine[gardes]
+        etat_grille = etat_grille[origine]
+        etat_colonnes = etat_colonnes[origine]
+        etat_lignes = np.column_stack([etat_lignes[origine], lignes[gardes]])
+        etat_noms = noms[gardes]
+        etat_suivant = suivant[gardes]
+        if len(etat_grille) > ETATS_FUSION:
+            etat_grille, etat_colonnes, etat_lignes, etat_noms, etat_suivant = _fusionner(
+                grilles, n, ligne_sortie, etat_grille, etat_colonnes, etat_lignes, etat_noms, etat_suivant)
+    #Tous les états restants donnent la même grille : on reconstruit celle du premier
+    return etat_noms[0][grilles[etat_grille[0]][etat_lignes[0]][:, etat_colonnes[0]]]
+
+def _fusionner(grilles, n, ligne_sortie, etat_grille, etat_colonnes, etat_lignes, etat_noms, etat_suivant):
+    """
+    Ne garde qu'un état par classe d'états équivalents. Deux états ex æquo sont équivalents s'ils voient
+    la même grille restante : lignes pas encore placées, dans l'ordre de leurs colonnes, avec les chiffres
+    déjà renommés et les autres tels quels, et la même bande en cours. Leurs suites de lignes possibles sont
+    alors identiques, et la forme canonique ne change pas
+
+    """
+    nombre, taille = len(etat_grille), grilles.shape[1]
+    restantes = grilles[etat_grille[:, None, None], np.arange(taille)[None, :, None], etat_colonnes[:, None, :]]
+    restantes = restantes.reshape(nombre, taille * taille)
+    renommees = np.take_along_axis(etat_noms, restantes.astype(np.intp), axis=1)
+    #Chiffres pas encore renommés : gardés tels quels, mais distincts des chiffres renommés
+    cles = np.empty((nombre, taille * taille + 1), dtype=np.uint8)
+    cles[:, :-1] = np.where((restantes != 0) & (renommees == 0), 100 + restantes, renommees)
+    lignes_placees = (etat_lignes[:, :, None] * taille + np.arange(taille)).reshape(nombre, -1)
+    cles[np.arange(nombre)[:, None], lignes_placees] = 255
+    cles[:, -1] = etat_lignes[:, -1] // n if (ligne_sortie + 1) % n else 0
+    #Une clé par état (octets de la ligne), pour un tri sur une seule colonne
+    cles = cles.view(np.dtype((np.void, cles.shape[1]))).ravel()
+    _, premiers = np.unique(cles, return_index=True)
+    premiers.sort()
+    return (etat_grille[premiers], etat_colonnes[premiers], etat_lignes[premiers],
+            etat_noms[premiers], etat_suivant[premiers])
+
+def cle_canonique(valeurs):
+    """
+    Clé de 64 bits de la forme canonique d'un puzzle (identique pour tous les puzzles équivalents)
+
+    Parameters
+    ----------
+    valeurs : np.ndarray
+        Grille (taille, taille), 0 pour les cases vides
+
+    Returns
+    -------
+    int
+        Clé non nulle, stable d'une exécution à l'autre
+
+    """
+    empreinte = hashlib.blake2b(forme_canonique(valeurs).tobytes(), digest_size=8).digest()
+    return int.from_bytes(empreinte, "little") or 1
+
+
+class IndexCanonique():
+    """
+    Ensemble de clés de 64 bits en adressage ouvert (sondage linéaire), de capacité fixe,
+    gardé en mémoire ou projeté sur disque (np.memmap) pour dédoublonner de très gros lots
+
+    Le fichier commence par un en-tête de 24 octets (signature b"SDKH", version, nombre de clés,
+    capacité) suivi de la table des clés (uint64, 0 = emplacement libre).
+
+    Attributs
+    ---------
+    chemin : str ou None
+        Fichier de l'index (None pour un index en mémoire)
+    cles : np.ndarray
+        Table des clés
+    nombre : int
+        Nombre de clés présentes
+
+    """
+    def __init__(self, capacite=1 << 20, chemin=None):
+        """
+        Crée un index, ou rouvre celui qui existe déjà dans le fichier donné
+
+        Parameters
+        ----------
+        capacite : int, optional
+            Nombre d'emplacements (arrondi à la puissance de 2 supérieure). Il faut prévoir
+            environ 4/3 du nombre de puzzles distincts attendus. La valeur par défaut est 2^20
+        chemin : str, optional
+            Fichier de l'index. Par défaut, l'index est gardé en mémoire
+
+        Raises
+        ------
+        ValueError
+            Si le fichier existe mais n'est pas un index valide
+
+        """
+        self.chemin = chemin
+        capacite = 1 << max(capacite - 1, 1).bit_length()
+        if chemin is None:
+            self.cles = np.zeros(capacite, dtype=np.uint64)
+            self.nombre = 0
+        elif os.path.exists(chemin):
+            with open(chemin, "rb") as fichier:
+                signature, version, self.nombre, capacite = _ENTETE.unpack(fichier.read(_ENTETE.size))
+            if signature != SIGNATURE or version != VERSION:
+                raise ValueError(f"{chemin} n'est pas un index de puzzles valide (version {VERSION})")
+            self.cles = np.memmap(chemin, dtype=np.uint64, mode="r+", offset=_ENTETE.size, shape=(capacite,))
+        else:
+            with open(chemin, "wb") as fichier:
+                fichier.write(_ENTETE.pack(SIGNATURE, VERSION, 0, capacite))
+                fichier.truncate(_ENTETE.size + 8 * capacite)
+            self.nombre = 0
+            self.cles = np.memmap(chemin, dtype=np.uint64, mode="r+", offset=_ENTETE.size, shape=(capacite,))
+        self._masque = capacite - 1
+
+    def __len__(self):
+        return self.nombre
+
+    def __contains__(self, cle):
+        return self.cles[self._emplacement(cle)] == cle
+
+    def _emplacement(self, cle):
+        #Emplacement de la clé, ou premier emplacement libre de sa suite de sondage
+        cles, masque = self.cles, self._masque
+        position = cle & masque
+        while True:
+            occupant = int(cles[position])
+            if occupant == cle or occupant == 0:
+                return position
+            position = (position + 1) & masque
+
+    def ajouter_cle(self, cle):
+        """
+        Ajoute une clé à l'index
+
+        Parameters
+        ----------
+        cle : int
+            Clé non nulle de 64 bits
+
+        Returns
+        -------
+        bool
+            True si la clé était nouvelle, False si elle était déjà présente
+
+        Raises
+        ------
+        ValueError
+            Si l'index est trop rempli
+
+        """
+        position = self._emplacement(cle)
+        if self.cles[position] == cle:
+            return False
+        if self.nombre + 1 > TAUX_MAXIMAL * len(self.cles):
+            raise ValueError(f"Index plein ({self.nombre} clés pour {len(self.cles)} emplacements)")
+        self.cles[position] = cle
+        self.nombre += 1
+        return True
+
+    def ajouter(self, grille):
+        """
+        Ajoute un puzzle à l'index, par la clé de sa forme canonique
+
+        Parameters
+        ----------
+        grille : Grille
+            Puzzle à ajouter
+
+        Returns
+        -------
+        bool
+            True si aucun puzzle équivalent n'était déjà présent
+
+        """
+        return self.ajouter_cle(cle_canonique(grille.grille))
+
+    def fermer(self):
+        """
+        Enregistre le nombre de clés dans l'en-tête et ferme le fichier (sans effet pour un index en mémoire)
+
+        """
+        if self.chemin is None or self.cles is None:
+            return
+        self.cles.flush()
+        with open(self.chemin, "r+b") as fichier:
+            fichier.write(_ENTETE.pack(SIGNATURE, VERSION, self.nombre, len(self.cles)))
+        self.cles = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *erreur):
+        self.fermer()
+
+
+def dedoublonner(entrees, index=None):
+    """
+    Filtre à la volée les puzzles équivalents à un puzzle déjà vu
+
+    Parameters
+    ----------
+    entrees : iterable
+        Grilles, ou couples (grille, métadonnées) comme ceux rendus par corpus.lire_corpus
+    index : IndexCanonique, optional
+        Index des puzzles déjà vus. Par défaut, un nouvel index en mémoire
+
+    Yields
+    ------
+    Grille ou tuple
+        Entrées dont aucun équivalent n'a été vu auparavant
+
+    """
+    if index is None:
+        index = IndexCanonique()
+    for entree in entrees:
+        grille = entree[0] if isinstance(entree, tuple) else entree
+        if index.ajouter(grille):
+            yield entree
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (3, 4):
+        print("Usage : python canonique.py puzzles.txt uniques.txt [index.idx]")
+        sys.exit(1)
+    from corpus import lire_corpus, ecrire_corpus
+    with IndexCanonique(chemin=sys.argv[3] if len(sys.argv) == 4 else None) as index:
+        nombre = ecrire_corpus(sys.argv[2], dedoublonner(lire_corpus(sys.argv[1]), index))
+    print(f"{nombre} puzzles uniques écrits dans {sys.argv[2]}")
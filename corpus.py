@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+Lecture et écriture de corpus de puzzles au format usuel « une grille par ligne » :
+81 caractères par grille, lus ligne par ligne, avec "0" ou "." pour les cases vides.
+Les grilles 16x16 et 25x25 (256 et 625 caractères) notent les chiffres au-delà de 9 par des
+lettres (A = 10, B = 11, ..., P = 25), en majuscules ou en minuscules.
+Une ligne peut être suivie (après un espace, une tabulation ou une virgule) de la solution
+sur 81 caractères puis de colonnes de métadonnées libres (difficulté, graine, ...).
+Les lignes vides et celles commençant par "#" sont ignorées.
+
+Exemple :
+    003020600900305001001806400008102900700000008006708200002609500800203009005010300 483921657967345821251876493548132976729564138136798245372689514814253769695417382 facile
+
+La lecture se fait à la volée (générateurs) pour pouvoir traiter des corpus de plusieurs Go,
+et chaque ligne est décodée directement dans le tableau d'octets de la grille.
+"""
+
+import gzip
+import re
+import numpy as np
+
+from main_propre import Grille, SYMBOLES
+
+
+#Table de décodage octet -> valeur (255 = caractère invalide)
+_DECODAGE = np.full(256, 255, dtype=np.uint8)
+_DECODAGE[ord(".")] = 0
+for _chiffre, _symbole in enumerate(SYMBOLES):
+    _DECODAGE[ord(_symbole)] = _chiffre
+    _DECODAGE[ord(_symbole.lower())] = _chiffre
+#Table d'encodage valeur -> octet
+_ENCODAGE = np.frombuffer(SYMBOLES.encode("ascii"), dtype=np.uint8)
+
+_SEPARATEURS = re.compile(rb"[\s,;]+")
+
+
+def _ouvrir(source, mode):
+    #Accepte un chemin (éventuellement compressé en .gz) ou un fichier déjà ouvert
+    if not isinstance(source, str):
+        return source, False
+    if source.endswith(".gz"):
+        return gzip.open(source, mode), True
+    return open(source, mode), True
+
+def decoder(octets, taille=None):
+    """
+    Décode une grille écrite sur une ligne en tableau de valeurs
+
+    Parameters
+    ----------
+    octets : bytes
+        Caractères de la grille ("0" ou "." pour les cases vides)
+    taille : int, optional
+        Taille de la grille. Par défaut, elle est déduite du nombre de caractères (81, 256 ou 625)
+
+    Returns
+    -------
+    np.ndarray
+        Tableau 2D d'entiers non signés sur 8 bits
+
+    """
+    if taille is None:
+        taille = int(round(len(octets) ** 0.5))
+    nb_cases = taille * taille
+    if len(octets) != nb_cases:
+        raise ValueError(f"Une grille doit faire {nb_cases} caractères (reçu : {len(octets)})")
+    valeurs = _DECODAGE[np.frombuffer(octets, dtype=np.uint8)]
+    if (valeurs > taille).any():
+        raise ValueError(f"Caractère invalide dans la grille : {octets!r}")
+    return valeurs.reshape(taille, taille)
+
+def encoder(valeurs, vide="."):
+    """
+    Écrit un tableau de valeurs sur une ligne
+
+    Parameters
+    ----------
+    valeurs : np.ndarray
+        Tableau de valeurs (0 = case vide)
+    vide : str, optional
+        Caractère utilisé pour les cases vides. La valeur par défaut est "."
+
+    Returns
+    -------
+    str
+        Grille sur une ligne
+
+    """
+    caracteres = _ENCODAGE[np.asarray(valeurs, dtype=np.uint8).ravel()].tobytes().decode("ascii")
+    return caracteres.replace("0", vide) if vide != "0" else caracteres
+
+def lire_corpus(source):
+    """
+    Lit un corpus de puzzles à la volée
+
+    Parameters
+    ----------
+    source : str ou fichier binaire
+        Chemin du fichier (.gz accepté) ou fichier ouvert en mode binaire
+
+    Yields
+    ------
+    tuple(Grille, list[str])
+        Grille lue (avec sa solution dans grille.solution si elle est présente) et
+        colonnes de métadonnées restantes
+
+    Raises
+    ------
+    ValueError
+        Si une ligne ne contient pas une grille valide (le numéro de ligne est indiqué)
+
+    """
+    fichier, a_fermer = _ouvrir(source, "rb")
+    try:
+        for numero, ligne in enumerate(fichier, 1):
+            ligne = ligne.strip()
+            if not ligne or ligne.startswith(b"#"):
+                continue
+            colonnes = _SEPARATEURS.split(ligne)
+            try:
+                grille = Grille.depuis_tableau(decoder(colonnes[0]))
+                suite = 1
+                if len(colonnes) > 1 and len(colonnes[1]) == len(colonnes[0]):
+                    grille.solution = decoder(colonnes[1])
+                    suite = 2
+            except ValueError as erreur:
+                raise ValueError(f"Ligne {numero} : {erreur}") from None
+            yield grille, [colonne.decode("utf-8") for colonne in colonnes[suite:]]
+    finally:
+        if a_fermer:
+            fichier.close()
+
+def ecrire_corpus(destination, entrees, vide="."):
+    """
+    Écrit des puzzles au format « une grille par ligne », à la volée
+
+    Parameters
+    ----------
+    destination : str ou fichier texte
+        Chemin du fichier (.gz accepté) ou fichier ouvert en mode texte
+    entrees : iterable
+        Grilles, ou couples (grille, métadonnées). La solution est écrite si grille.solution est connue
+    vide : str, optional
+        Caractère utilisé pour les cases vides. La valeur par défaut est "."
+
+    Returns
+    -------
+    int
+        Nombre de puzzles écrits
+
+    """
+    fichier, a_fermer = _ouvrir(destination, "wt")
+    nombre = 0
+    try:
+        for entree in entrees:
+            grille, metadonnees = entree if isinstance(entree, tuple) else (entree, ())
+            colonnes = [encoder(grille.grille, vide)]
+            if grille.solution is not None:
+                colonnes.append(encoder(grille.solution))
+            colonnes.extend(str(valeur) for valeur in metadonnees)
+            fichier.write(" ".join(colonnes) + "\n")
+            nombre += 1
+    finally:
+        if a_fermer:
+            fichier.close()
+    return nombre
@@ -7,23 +7,109 @@ Auteur : gpotel
 
 import random as rd
 import copy as cp
+import os
+import sys
+import argparse
+import contextlib
+import json
+import struct
+import time
+import weakref
+import concurrent.futures as cf
+from array import array
 import numpy as np 
 
+import techniques as tq
+
+
+#Symboles utilisés pour écrire une grille sur une ligne (au-delà de 9 : A = 10, B = 11, ...)
+SYMBOLES = "0123456789ABCDEFGHIJKLMNOP"
+
+
+class _Valeurs(np.ndarray):
+    """
+    Tableau des valeurs d'une Grille. Une écriture directe (grille.grille[ligne, colonne] = valeur,
+    y compris à travers une tranche ou une vue à plat) invalide les masques de chiffres de la grille,
+    qui sont reconstruits à leur prochaine utilisation. Les résultats de calculs (comparaisons,
+    sommes, ...) sont des tableaux ordinaires
+    
+    """
+    __slots__ = ("_grille",)
+    
+    def __array_finalize__(self, origine):
+        #Seules les vues (tranches, ravel, reshape, ...) partagent la mémoire de la grille et en gardent le lien
+        base = self.base
+        vue = base is not None and (base is origine or base is getattr(origine, "base", None))
+        self._grille = getattr(origine, "_grille", None) if vue else None
+    
+    def __array_wrap__(self, sortie, contexte=None, return_scalar=False):
+        sortie = sortie.view(np.ndarray)
+        return sortie[()] if sortie.ndim == 0 else sortie
+    
+    def __setitem__(self, indice, valeur):
+        super().__setitem__(indice, valeur)
+        grille = self._grille() if self._grille is not None else None
+        if grille is not None:
+            grille.liberer_masques()
+
+
+class _Bloquees(np.ndarray):
+    """
+    Tableau booléen des cases bloquées d'une Grille, reconstruit à partir de son masque de bits.
+    Une écriture (grille.bloquee[ligne, colonne] = True, y compris à travers une tranche)
+    est reportée dans le masque de bits de la grille
+    
+    """
+    __slots__ = ("_grille", "_racine")
+    
+    def __array_finalize__(self, origine):
+        #Les vues gardent la grille et le tableau complet, réécrit en entier dans le masque à chaque écriture
+        base = self.base
+        vue = base is not None and (base is origine or base is getattr(origine, "base", None))
+        self._grille = getattr(origine, "_grille", None) if vue else None
+        self._racine = None
+        if self._grille is not None:
+            self._racine = origine if origine._racine is None else origine._racine
+    
+    __array_wrap__ = _Valeurs.__array_wrap__
+    
+    def __setitem__(self, indice, valeur):
+        super().__setitem__(indice, valeur)
+        if self._grille is not None:
+            self._grille.bloquee = self if self._racine is None else self._racine
 
 
 class Grille():
     """ Représente une grille de sudoku 
     
+    La grille est stockée de façon compacte : un octet par case pour les valeurs et un entier
+    dont chaque bit indique si une case est bloquée (soit 81 + 11 octets utiles pour une grille 9x9).
+    Les masques de chiffres des lignes, colonnes et carrés ne sont construits qu'à la première
+    utilisation, une grille simplement stockée n'en a donc pas besoin.
+    
     Attributs
     ---------
     taille : int
-        Taille de la grille (9 pour une grille usuelle)
+        Taille de la grille (9 pour une grille usuelle, 16 ou 25 pour les grandes grilles)
+    taille_carre : int
+        Taille des carrés (racine carrée de la taille : 3 pour une grille 9x9)
     grille : np.ndarray
-        Tableau 2D contenant les valeurs du Sudoku (à = vide)
+        Tableau 2D d'entiers non signés sur 8 bits contenant les valeurs du Sudoku (0 = vide).
+        Il peut être modifié directement : les masques de chiffres sont alors reconstruits
     bloquee : np.ndarray
-        Tableau 2d booléen indiquant si une case est bloquée (True) ou libre (False)
+        Tableau 2d booléen indiquant si une case est bloquée (True) ou libre (False), reconstruit
+        à chaque lecture à partir d'un masque de bits. Une écriture dans ce tableau met le masque à jour
+    solution : np.ndarray ou None
+        Grille complète associée, si elle est connue
+    difficulte : int ou None
+        Difficulté de la grille (nombre de cases retirées), si elle est connue
+    niveau : int ou None
+        Niveau de la technique humaine la plus difficile nécessaire (voir techniques.py), s'il est connu
     
     """
+    __slots__ = ("taille", "taille_carre", "_valeurs", "_bloquees", "masques_lignes", "masques_colonnes", "masques_carres",
+                 "_doublons", "solution", "difficulte", "niveau", "__weakref__")
+    
     def __init__(self, taille):
         """
         Initialise les paramètres de la grille. 
@@ -31,12 +117,186 @@ class Grille():
         Parameters
         ----------
         taille : int
-            Taille de la grille
+            Taille de la grille (un carré parfait : 4, 9, 16, 25)
+
+        Raises
+        ------
+        ValueError
+            Si la taille n'est pas un carré parfait
 
         """
+        self._fixer_taille(taille)
+        self.grille = np.zeros((self.taille,self.taille), dtype=np.uint8)
+        self._bloquees = 0
+        self.masques_lignes = self.masques_colonnes = self.masques_carres = None
+        self._doublons = False
+        self.solution = None
+        self.difficulte = None
+        self.niveau = None
+    
+    def _fixer_taille(self, taille):
+        taille_carre = int(round(taille ** 0.5))
+        if taille_carre * taille_carre != taille or not 1 <= taille <= len(SYMBOLES) - 1:
+            raise ValueError(f"La taille d'une grille doit être un carré parfait entre 1 et {len(SYMBOLES) - 1} (reçu : {taille})")
         self.taille = taille
-        self.grille = np.zeros((self.taille,self.taille))
-        self.bloquee = np.zeros((self.taille,self.taille))
+        self.taille_carre = taille_carre
+    
+    @property
+    def grille(self):
+        return self._valeurs
+    
+    @grille.setter
+    def grille(self, tableau):
+        #Vue sur le tableau donné (sans copie), reliée à la grille pour que les écritures directes invalident les masques
+        valeurs = np.asarray(tableau).view(_Valeurs)
+        valeurs._grille = weakref.ref(self)
+        self._valeurs = valeurs
+        self.masques_lignes = self.masques_colonnes = self.masques_carres = None
+    
+    def __setstate__(self, etat):
+        #Copie ou transfert vers un processus de travail : le tableau des valeurs est relié à la nouvelle grille
+        for nom, valeur in etat[1].items():
+            setattr(self, nom, valeur)
+        self.grille = self._valeurs
+    
+    @property
+    def bloquee(self):
+        """
+        Tableau 2D booléen des cases bloquées, reconstruit à partir du masque de bits.
+        Les écritures (grille.bloquee[ligne, colonne] = True) sont reportées dans le masque ;
+        bloquer() reste plus rapide pour une seule case
+
+        """
+        nb_cases = self.taille * self.taille
+        octets = np.frombuffer(self._bloquees.to_bytes((nb_cases + 7) // 8, "little"), dtype=np.uint8)
+        bloquee = np.unpackbits(octets, count=nb_cases, bitorder="little").astype(bool).reshape(self.taille, self.taille)
+        bloquee = bloquee.view(_Bloquees)
+        bloquee._grille = self
+        bloquee._racine = None
+        return bloquee
+    
+    @bloquee.setter
+    def bloquee(self, tableau):
+        bits = np.packbits(np.asarray(tableau, dtype=bool).ravel(), bitorder="little")
+        self._bloquees = int.from_bytes(bits.tobytes(), "little")
+    
+    def est_bloquee(self, ligne, colonne):
+        """
+        Indique si une case est bloquée
+
+        Parameters
+        ----------
+        ligne : int
+            Indice de ligne (0-8)
+        colonne : int
+            Indice de colonne (0-8)
+
+        Returns
+        -------
+        bool
+            True si la case est bloquée, False sinon
+
+        """
+        return bool((self._bloquees >> int(ligne * self.taille + colonne)) & 1)
+    
+    def bloquer(self, ligne, colonne, etat=True):
+        """
+        Bloque ou débloque une case
+
+        Parameters
+        ----------
+        ligne : int
+            Indice de ligne (0-8)
+        colonne : int
+            Indice de colonne (0-8)
+        etat : bool, optional
+            True pour bloquer la case, False pour la débloquer. La valeur par défaut est True
+
+        """
+        bit = 1 << int(ligne * self.taille + colonne)
+        if etat:
+            self._bloquees |= bit
+        else:
+            self._bloquees &= ~bit
+    
+    def bloquer_tout(self):
+        """
+        Bloque toutes les cases de la grille
+
+        """
+        self._bloquees = (1 << (self.taille * self.taille)) - 1
+    
+    def _reconstruire_masques(self):
+        """
+        Recalcule les masques de chiffres (un bit par chiffre) de chaque ligne, colonne et carré
+        à partir du contenu de la grille. Le bit i est à 1 si le chiffre i est déjà présent.
+
+        """
+        self.masques_lignes = [0] * self.taille
+        self.masques_colonnes = [0] * self.taille
+        self.masques_carres = [0] * self.taille
+        self._doublons = False
+        for ligne, colonne in np.argwhere(self.grille != 0).tolist():
+            bit = 1 << int(self.grille[ligne, colonne])
+            carre = self.taille_carre * (ligne // self.taille_carre) + colonne // self.taille_carre
+            if (self.masques_lignes[ligne] | self.masques_colonnes[colonne] | self.masques_carres[carre]) & bit:
+                self._doublons = True
+            self.masques_lignes[ligne] |= bit
+            self.masques_colonnes[colonne] |= bit
+            self.masques_carres[carre] |= bit
+    
+    def _assurer_masques(self):
+        """
+        Construit les masques de chiffres s'ils ne l'ont pas encore été
+
+        """
+        if self.masques_lignes is None:
+            self._reconstruire_masques()
+    
+    def liberer_masques(self):
+        """
+        Libère les masques de chiffres (ils seront reconstruits à la prochaine utilisation),
+        pour réduire la mémoire occupée par une grille qu'on ne fait que conserver
+
+        """
+        self.masques_lignes = self.masques_colonnes = self.masques_carres = None
+    
+    def _poser(self, ligne, colonne, valeur):
+        """
+        Écrit une valeur dans une case vide et met à jour les masques, sans aucune vérification
+        (utilisé par le générateur et le résolveur)
+
+        """
+        if self.masques_lignes is None:
+            self._reconstruire_masques()
+        #Écriture sans passer par _Valeurs.__setitem__ : les masques sont tenus à jour ici
+        np.ndarray.__setitem__(self._valeurs, (ligne, colonne), valeur)
+        bit = 1 << int(valeur)
+        self.masques_lignes[ligne] |= bit
+        self.masques_colonnes[colonne] |= bit
+        n = self.taille_carre
+        self.masques_carres[n * (ligne // n) + colonne // n] |= bit
+    
+    def _effacer(self, ligne, colonne):
+        """
+        Vide une case et met à jour les masques, sans aucune vérification
+
+        """
+        valeur = int(self.grille[ligne, colonne])
+        if valeur == 0:
+            return
+        np.ndarray.__setitem__(self._valeurs, (ligne, colonne), 0)
+        if self.masques_lignes is None:
+            return
+        if self._doublons:
+            #La grille de départ contenait des doublons : les bits ne suffisent plus
+            self._reconstruire_masques()
+            return
+        bit = ~(1 << valeur)
+        self.masques_lignes[ligne] &= bit
+        self.masques_colonnes[colonne] &= bit
+        n = self.taille_carre
+        self.masques_carres[n * (ligne // n) + colonne // n] &= bit
     
     def en_matrice(self, liste):
         """
@@ -47,9 +307,62 @@ class Grille():
         liste : list[list[int]]
             Liste contenant les valeurs du sudoku (0 = cases vides)
 
+        Raises
+        ------
+        ValueError
+            Si la liste n'est pas carrée
+
         """
-        self.grille = np.array(liste)
+        grille = np.array(liste, dtype=np.uint8)
+        if grille.ndim != 2 or grille.shape[0] != grille.shape[1]:
+            raise ValueError(f"Une grille doit être carrée (reçu : forme {grille.shape})")
+        self.grille = grille
+        self._fixer_taille(len(self.grille))
         self.bloquee = self.grille != 0
+        self.liberer_masques()
+    
+    @classmethod
+    def depuis_tableau(cls, valeurs):
+        """
+        Crée une grille qui utilise directement un tableau de valeurs (sans copie) et
+        marque les cases non-nulles comme bloquées
+
+        Parameters
+        ----------
+        valeurs : np.ndarray
+            Tableau d'entiers non signés sur 8 bits, de forme (taille, taille) ou (taille * taille,)
+
+        Returns
+        -------
+        Grille
+            Grille construite sur le tableau
+
+        """
+        taille = int(round(len(valeurs.ravel()) ** 0.5))
+        grille = cls(taille)
+        grille.grille = valeurs.reshape(taille, taille)
+        grille.bloquee = grille.grille != 0
+        return grille
+    
+    @classmethod
+    def depuis_chaine(cls, chaine):
+        """
+        Crée une grille à partir d'une chaîne d'une ligne ("0" ou "." pour les cases vides)
+
+        Parameters
+        ----------
+        chaine : str
+            Grille lue ligne par ligne (81 caractères pour une grille 9x9, avec A = 10, B = 11, ... au-delà de 9)
+
+        Returns
+        -------
+        Grille
+            Grille correspondante, cases non-nulles bloquées
+
+        """
+        valeurs = np.array([0 if caractere == "." else SYMBOLES.index(caractere) for caractere in chaine.strip().upper()],
+                           dtype=np.uint8)
+        return cls.depuis_tableau(valeurs)
       
     def en_liste(self):
         """
@@ -63,6 +376,19 @@ class Grille():
         """
         return self.grille.tolist()
     
+    def en_chaine(self):
+        """
+        Transforme la grille en chaîne d'une ligne (81 caractères pour une grille 9x9, 0 = case vide,
+        A = 10, B = 11, ... pour les grandes grilles)
+
+        Returns
+        -------
+        str
+            Grille sous forme de chaîne, lue ligne par ligne
+
+        """
+        return "".join(SYMBOLES[valeur] for valeur in self.grille.ravel().tolist())
+    
     def est_correct(self, ligne:int, colonne:int, valeur:int):
         """
         Vérifie si une valeur peut-être placée à une position donnée (selon les règles du sudoku)
@@ -82,17 +408,65 @@ class Grille():
             True si la valeur peut-être placée, False sinon
 
         """
-        if self.bloquee[ligne, colonne]:
+        if self.est_bloquee(ligne, colonne):
             return False
-        if valeur in self.grille[ligne, :]:
-            return False
-        if valeur in self.grille[:, colonne]:
-            return False
-        l, c = 3 * (ligne // 3), 3 * (colonne // 3)
-        if valeur in self.grille[l:l+3, c:c+3]:
-            return False
-        return True
-        #Vérifie si un coup est correct
+        if valeur < 1:
+            #0 correspond aux cases vides : on garde la vérification par parcours
+            n = self.taille_carre
+            l, c = n * (ligne // n), n * (colonne // n)
+            return not (valeur in self.grille[ligne, :] or valeur in self.grille[:, colonne]
+                        or valeur in self.grille[l:l+n, c:c+n])
+        if self.masques_lignes is None:
+            self._reconstruire_masques()
+        n = self.taille_carre
+        masque = (self.masques_lignes[ligne] | self.masques_colonnes[colonne]
+                  | self.masques_carres[n * (ligne // n) + colonne // n])
+        return not (masque >> int(valeur)) & 1
+    
+    def masque_candidats(self, ligne, colonne):
+        """
+        Calcule en O(1) l'ensemble des chiffres qui peuvent être placés dans une case
+
+        Parameters
+        ----------
+        ligne : int
+            Indice de ligne (0-8)
+        colonne : int
+            Indice de colonne (0-8)
+
+        Returns
+        -------
+        int
+            Masque de bits : le bit i est à 1 si le chiffre i peut être placé (0 si la case est bloquée)
+
+        """
+        if self.est_bloquee(ligne, colonne):
+            return 0
+        self._assurer_masques()
+        n = self.taille_carre
+        masque = (self.masques_lignes[ligne] | self.masques_colonnes[colonne]
+                  | self.masques_carres[n * (ligne // n) + colonne // n])
+        return ~masque & ((1 << (self.taille + 1)) - 2)
+    
+    def candidats(self, ligne, colonne):
+        """
+        Liste les chiffres qui peuvent être placés dans une case
+
+        Parameters
+        ----------
+        ligne : int
+            Indice de ligne (0-8)
+        colonne : int
+            Indice de colonne (0-8)
+
+        Returns
+        -------
+        list[int]
+            Chiffres valides pour la case, dans l'ordre croissant
+
+        """
+        masque = self.masque_candidats(ligne, colonne)
+        return [chiffre for chiffre in range(1, self.taille + 1) if (masque >> chiffre) & 1]
     
     def completer_case(self, ligne, colonne, valeur):
         """
@@ -113,12 +487,13 @@ class Grille():
             True si la valeur est placée, False sinon
 
         """
-        if self.bloquee[ligne, colonne]:
+        if self.est_bloquee(ligne, colonne):
             return False
         if valeur == 0:
             return self.vider_case(ligne, colonne)
         if self.est_correct(ligne, colonne, valeur):
-            self.grille[ligne, colonne] = valeur
+            self._effacer(ligne, colonne)
+            self._poser(ligne, colonne, valeur)
             return True
         return False
     
@@ -139,9 +514,9 @@ class Grille():
             True si la case est vidée, False sinon
 
         """
-        if self.bloquee[ligne, colonne]:
+        if self.est_bloquee(ligne, colonne):
             return False
-        self.grille[ligne, colonne] = 0
+        self._effacer(ligne, colonne)
         return True
     
     def est_complete(self):
@@ -154,7 +529,7 @@ class Grille():
             True si la grille est complète, False sinon
 
         """
-        return self.case_vide() is None
+        return bool(self.grille.all())
     
     def case_vide(self):
         """
@@ -168,13 +543,122 @@ class Grille():
         """
         vide = np.argwhere(self.grille == 0)
         if vide.size:
-            return tuple(vide[0])
+            return tuple(vide[0].tolist())
         else:
             return None
     
-    def set_difficulte():
-        pass
-        #Permet de sélectionner une difficulté (le nombre de chiffres initialement présents sur la grille)
+    def set_difficulte(self):
+        """
+        Évalue la difficulté de la grille avec les techniques de résolution humaines
+        et mémorise le niveau obtenu dans self.niveau
+
+        Returns
+        -------
+        dict
+            Évaluation détaillée (voir techniques.EvaluateurTechniques.evaluer)
+
+        """
+        evaluation = tq.evaluer(self.grille)
+        self.niveau = evaluation["niveau"]
+        return evaluation
+
+
+
+class Instrumentation():
+    """
+    Compteurs et points d'accroche pour observer le résolveur et le générateur
+    
+    Un objet Instrumentation est passé (optionnellement) à ResolveurSudoku ou à GenerateurSudoku.
+    Sans instrumentation (None, par défaut), le code instrumenté ne fait qu'un test par nœud.
+    Le crochet, s'il est donné, est appelé pour chaque événement avec son nom et ses détails :
+        - "phase" : nom, duree (fin d'une phase du générateur : "remplissage", "retrait")
+        - "retrait" : ligne, colonne, accepte, noeuds (tentative de retrait d'une case)
+        - "rejet" : essai (grille pleine abandonnée, la difficulté visée n'ayant pas été atteinte)
+        - "branchement" : ligne, colonne, candidats (choix d'une case par le résolveur)
+        - "retour_arriere" : ligne, colonne (le résolveur abandonne une case)
+    
+    Attributs
+    ---------
+    noeuds : int
+        Nœuds explorés par les recherches (résolution et remplissage de la grille)
+    retours_arriere : int
+        Nombre de retours en arrière (valeur essayée puis effacée)
+    appels_est_correct : int
+        Nombre d'appels à Grille.est_correct faits par le code instrumenté
+    retraits_acceptes : int
+        Cases retirées en conservant l'unicité
+    retraits_rejetes : int
+        Cases remises car leur retrait rendait la solution non unique
+    verifications_unicite : int
+        Nombre de vérifications d'unicité
+    noeuds_unicite : int
+        Nœuds explorés par les vérifications d'unicité
+    temps : dict
+        Durée cumulée (en secondes) de chaque phase
+    crochet : callable ou None
+        Fonction appelée à chaque événement : crochet(nom, details)
+    
+    """
+    COMPTEURS = ("noeuds", "retours_arriere", "appels_est_correct", "retraits_acceptes",
+                 "retraits_rejetes", "verifications_unicite", "noeuds_unicite")
+    
+    def __init__(self, crochet=None):
+        """
+        Initialise des compteurs à zéro
+
+        Parameters
+        ----------
+        crochet : callable, optional
+            Fonction appelée à chaque événement, avec le nom de l'événement et un dictionnaire de détails
+
+        """
+        self.crochet = crochet
+        self.reinitialiser()
+    
+    def reinitialiser(self):
+        """
+        Remet tous les compteurs et les temps à zéro
+
+        """
+        for nom in self.COMPTEURS:
+            setattr(self, nom, 0)
+        self.temps = {}
+    
+    def evenement(self, type_evenement, **details):
+        """
+        Transmet un événement au crochet, s'il y en a un
+
+        """
+        if self.crochet is not None:
+            self.crochet(type_evenement, details)
+    
+    @contextlib.contextmanager
+    def phase(self, nom):
+        """
+        Chronomètre une phase (à utiliser avec with) et cumule sa durée dans temps[nom]
+
+        """
+        debut = time.perf_counter()
+        try:
+            yield
+        finally:
+            duree = time.perf_counter() - debut
+            self.temps[nom] = self.temps.get(nom, 0.0) + duree
+            self.evenement("phase", nom=nom, duree=duree)
+    
+    def rapport(self):
+        """
+        Rassemble les compteurs et les temps
+
+        Returns
+        -------
+        dict
+            Valeur de chaque compteur, et temps par phase sous la clé "temps"
+
+        """
+        rapport = {nom: getattr(self, nom) for nom in self.COMPTEURS}
+        rapport["temps"] = dict(self.temps)
+        return rapport
 
 
 
@@ -186,188 +670,1706 @@ class GenerateurSudoku():
     ---------
     difficulte : int
         Nombre de cases à retirer pour définir la difficulté
+    taille : int
+        Taille des grilles générées (9, 16, 25, ...)
+    moteur : type ou None
+        Classe de résolveur utilisée pour vérifier l'unicité de la solution (None = OracleUnicite)
+    aleatoire : random.Random
+        Générateur de nombres aléatoires (le module random lui-même si aucune graine n'est donnée)
+    instrumentation : Instrumentation ou None
+        Compteurs et crochets de suivi (None pour désactiver le suivi)
+    cible : tuple(int, int) ou None
+        Niveaux de technique minimal et maximal visés (voir techniques.py), None pour ne viser que le nombre de cases retirées
+    remplissage : str
+        Méthode de remplissage de la grille pleine ("recherche" ou "motif", voir REMPLISSAGES)
+    bilan_retrait : dict ou None
+        Bilan du dernier retrait de cases : objectif (cases à retirer), retirees, essayees (vérifications d'unicité)
+        et necessaires (cases dont le retrait rendrait la solution multiple, ou trop coûteux à vérifier)
     
     """
     
-    def __init__(self, difficulte=40):
+    #Nombre de cases retirées par défaut selon la taille. Au-delà d'environ 42 % de cases vides,
+    #vérifier l'unicité d'une grille 25x25 devient très coûteux
+    DIFFICULTES = {4: 8, 9: 40, 16: 126, 25: 260}
+    #Nombre maximal de nœuds de l'oracle par tentative de retrait (n'est jamais atteint en 9x9,
+    #mais évite qu'une seule vérification ne dure des minutes en 16x16 ou 25x25)
+    BUDGET_UNICITE = 20000
+    #Nombre maximal de grilles pleines essayées pour atteindre une cible de difficulté
+    ESSAIS_CIBLE = 500
+    #Méthodes de remplissage de la grille pleine :
+    #   - "recherche" : recherche MRV aléatoire (quelques millisecondes, toutes les grilles sont possibles)
+    #   - "motif" : grille construite par une formule puis mélangée par des permutations qui préservent
+    #     la validité (quelques microsecondes, mais toutes les grilles obtenues sont équivalentes par symétrie)
+    REMPLISSAGES = ("recherche", "motif")
+    
+    def __init__(self, difficulte=None, moteur=None, graine=None, instrumentation=None, taille=9, cible=None,
+                 remplissage="recherche"):
         """
         Initialise le générateur avec sa difficulté
 
         Parameters
         ----------
         difficulte : int, optional
-            Nombre de cases à retirer de la grille. On le met à 40 par défaut (la moitié de la grille)
+            Nombre de cases à retirer de la grille. Par défaut, environ la moitié de la grille (40 pour une grille 9x9, voir DIFFICULTES)
+        moteur : type, optional
+            Classe de résolveur utilisée pour compter les solutions (ResolveurSudoku ou ResolveurDLX).
+            Par défaut (None), l'unicité est vérifiée par un OracleUnicite, beaucoup plus rapide
+        graine : int, optional
+            Graine rendant la génération reproductible. Par défaut, on utilise l'état global du module random
+        instrumentation : Instrumentation, optional
+            Compteurs et crochets de suivi. Par défaut, aucun suivi
+        taille : int, optional
+            Taille des grilles générées. La valeur par défaut est 9
+        cible : int ou str, optional
+            Difficulté visée : niveau, technique ("x_wing", ...) ou catégorie ("difficile", ...).
+            Les cases sont alors retirées (au moins difficulte, sauf si plus aucune ne peut l'être) sans jamais
+            dépasser ce niveau, et jusqu'à ce que la grille le demande. Par défaut, on ne vise que le nombre de cases retirées
+        remplissage : str, optional
+            Méthode de remplissage de la grille pleine (voir REMPLISSAGES). La valeur par défaut est "recherche"
+
+        Raises
+        ------
+        ValueError
+            Si la méthode de remplissage est inconnue
 
         """
+        if remplissage not in self.REMPLISSAGES:
+            raise ValueError(f"Remplissage inconnu : {remplissage} (attendu : {', '.join(self.REMPLISSAGES)})")
+        self.remplissage = remplissage
+        self.taille = taille
+        self.cible = None if cible is None else tq.intervalle(cible)
+        if difficulte is None:
+            difficulte = self.DIFFICULTES.get(taille, round(0.4 * taille * taille))
         self.difficulte = difficulte
+        self.moteur = moteur
+        self.aleatoire = rd if graine is None else rd.Random(graine)
+        self.instrumentation = instrumentation
+        self.bilan_retrait = None
+        self._echeance = None
         
-    def generer_grille(self):
+    def generer_grille(self, duree_max=None):
         """
         Génère une grille de sudoku pleine, puis retire des cases
         pour créer une grille jouable
 
+        Parameters
+        ----------
+        duree_max : float, optional
+            Durée maximale en secondes, vérifiée entre deux grilles pleines et, avec une cible,
+            entre deux retraits. Par défaut, pas de limite
+
+        Returns
+        -------
+        grille : Grille
+            Objet Grille contenant la configuration initiale du sudoku (et son niveau si une cible est donnée)
+
+        Raises
+        ------
+        RuntimeError
+            Si la cible de difficulté n'est pas atteinte après ESSAIS_CIBLE grilles pleines
+        TimeoutError
+            Si la durée maximale est dépassée
+
+        """
+        self._echeance = None if duree_max is None else time.perf_counter() + duree_max
+        for essai in range(self.ESSAIS_CIBLE if self.cible is not None else 1):
+            self._verifier_echeance()
+            grille = Grille(self.taille)
+            with self._phase("remplissage"):
+                if self.remplissage == "motif":
+                    self._remplir_grille_motif(grille)
+                else:
+                    self._remplir_grille_aleatoire(grille)
+            solution = cp.deepcopy(grille.grille)
+            with self._phase("retrait"):
+                if self.cible is None:
+                    self._retirer_cases(grille)
+                elif not self._retirer_cases_cible(grille):
+                    #Candidat rejeté : on repart d'une nouvelle grille pleine
+                    if self.instrumentation is not None:
+                        self.instrumentation.evenement("rejet", essai=essai)
+                    continue
+            grille.solution = solution
+            grille.difficulte = self.bilan_retrait["retirees"]
+            return grille
+        raise RuntimeError(f"Difficulté {self.cible} non atteinte après {self.ESSAIS_CIBLE} essais")
+    
+    def _verifier_echeance(self):
+        #Lève TimeoutError si la durée maximale de generer_grille est dépassée
+        if self._echeance is not None and time.perf_counter() > self._echeance:
+            raise TimeoutError("Durée maximale de génération dépassée")
+    
+    def _phase(self, nom):
+        #Chronomètre une phase si l'instrumentation est active
+        if self.instrumentation is None:
+            return contextlib.nullcontext()
+        return self.instrumentation.phase(nom)
+    
+    def _remplir_grille_aleatoire(self, grille):
+        """
+        Remplit aléatoirement la grille de sudoku entière et en "bloque" toutes les cases.
+        Les carrés de la diagonale ne se contraignent pas entre eux : ils sont remplis par des
+        permutations aléatoires, puis le reste est complété par une recherche MRV
+        qui essaie les chiffres dans un ordre aléatoire
+
+        Parameters
+        ----------
+        grille : Grille
+            Grille à remplir
+
+        """
+        n = grille.taille_carre
+        chiffres = list(range(1, grille.taille + 1))
+        while True:
+            grille.en_matrice([[0] * grille.taille for _ in range(grille.taille)])
+            for carre in range(n):
+                self.aleatoire.shuffle(chiffres)
+                for indice, chiffre in enumerate(chiffres):
+                    grille._poser(carre * n + indice // n, carre * n + indice % n, chiffre)
+            #Pour les petites grilles (4x4), les carrés de la diagonale peuvent rendre la grille impossible : on recommence
+            if ResolveurSudoku(grille, instrumentation=self.instrumentation, aleatoire=self.aleatoire).resoudre():
+                break
+        
+        grille.bloquer_tout()
+    
+    def _remplir_grille_motif(self, grille):
+        """
+        Remplit la grille sans aucune recherche : on part de la grille valide donnée par la formule
+        valeur(l, c) = (n * (l % n) + l // n + c) % taille + 1, puis on la mélange avec des
+        permutations qui préservent la validité (lignes dans leur bande, bandes, colonnes dans leur pile,
+        piles, chiffres, transposition). Toutes les cases sont ensuite "bloquées"
+
+        Parameters
+        ----------
+        grille : Grille
+            Grille à remplir
+
+        """
+        taille, n = grille.taille, grille.taille_carre
+        aleatoire = self.aleatoire
+        def permutation_par_blocs():
+            return [n * bloc + indice for bloc in aleatoire.sample(range(n), n) for indice in aleatoire.sample(range(n), n)]
+        lignes = np.array(permutation_par_blocs())
+        colonnes = np.array(permutation_par_blocs())
+        chiffres = np.array([0] + aleatoire.sample(range(1, taille + 1), taille), dtype=np.uint8)
+        motif = (n * (lignes[:, None] % n) + lignes[:, None] // n + colonnes[None, :]) % taille + 1
+        if aleatoire.random() < 0.5:
+            motif = motif.T
+        grille.grille = chiffres[motif]
+        grille.liberer_masques()
+        grille.bloquer_tout()
+    
+    def _retirer_cases(self, grille):
+        """
+        Retire des cases de la grille en s'assurant qu'il existe une solution unique.
+        Chaque case est essayée au plus une fois, dans un ordre aléatoire : une case dont le retrait rend
+        la solution multiple est nécessaire et le restera (retirer d'autres cases ne peut qu'ajouter
+        des solutions), il est donc inutile de la réessayer. Le retrait se termine ainsi après au plus
+        taille * taille vérifications d'unicité, même si la difficulté demandée est inatteignable
+
+        Parameters
+        ----------
+        grille : Grille
+            Grille complète à vider
+
+        Returns
+        -------
+        dict
+            Bilan du retrait (voir bilan_retrait)
+
+        """
+        oracle = OracleUnicite(grille.grille, self.BUDGET_UNICITE) if self.moteur is None else None
+        bilan = self._nouveau_bilan()
+        for ligne, colonne in self._ordre_retrait(grille):
+            if bilan["retirees"] >= self.difficulte:
+                break
+            if self._essayer_retrait(grille, ligne, colonne, oracle, bilan):
+                bilan["retirees"] += 1
+        return bilan
+    
+    def _retirer_cases_cible(self, grille):
+        """
+        Retire des cases jusqu'à atteindre la difficulté visée, en gardant une solution unique.
+        Chaque case est essayée une fois, dans un ordre aléatoire, et la grille est évaluée après chaque
+        retrait : un retrait qui la rend trop difficile est annulé. Le retrait continue jusqu'à ce que
+        self.difficulte cases soient retirées et que le niveau minimal visé soit atteint, et le candidat
+        est rejeté si toutes les cases ont été essayées sans atteindre ce niveau
+
+        Parameters
+        ----------
+        grille : Grille
+            Grille complète à vider
+
+        Returns
+        -------
+        bool
+            True si la cible est atteinte (le niveau est mémorisé dans grille.niveau), False sinon
+
+        """
+        minimum, maximum = self.cible
+        oracle = OracleUnicite(grille.grille, self.BUDGET_UNICITE) if self.moteur is None else None
+        bilan = self._nouveau_bilan()
+        #Niveau de la grille après le dernier retrait gardé
+        niveau_atteint = 0
+        for ligne, colonne in self._ordre_retrait(grille):
+            self._verifier_echeance()
+            valeur = grille.grille[ligne, colonne]
+            if not self._essayer_retrait(grille, ligne, colonne, oracle, bilan):
+                continue
+            #Évaluation limitée au niveau maximal : on s'arrête dès qu'une technique plus difficile serait nécessaire
+            niveau = tq.evaluer(grille.grille, limite=maximum)["niveau"]
+            if niveau > maximum:
+                if oracle is not None:
+                    oracle.remettre(ligne, colonne)
+                grille._poser(ligne, colonne, valeur)
+                grille.bloquer(ligne, colonne)
+                continue
+            bilan["retirees"] += 1
+            niveau_atteint = niveau
+            #Une cible facile est atteinte dès les premiers retraits : on continue jusqu'au nombre de cases voulu
+            if niveau >= minimum and bilan["retirees"] >= self.difficulte:
+                break
+        #Toutes les cases essayées (ou assez retirées) : le candidat n'est gardé qu'au niveau minimal visé
+        if niveau_atteint < minimum:
+            return False
+        grille.niveau = niveau_atteint
+        return True
+    
+    def _nouveau_bilan(self):
+        #Bilan du retrait en cours, consultable après la génération dans self.bilan_retrait
+        self.bilan_retrait = {"objectif": self.difficulte, "retirees": 0, "essayees": 0, "necessaires": []}
+        return self.bilan_retrait
+    
+    def _ordre_retrait(self, grille):
+        #Cases pleines dans un ordre aléatoire : chacune ne sera essayée qu'une fois
+        cases = [tuple(case) for case in np.argwhere(grille.grille != 0).tolist()]
+        self.aleatoire.shuffle(cases)
+        return cases
+    
+    def _essayer_retrait(self, grille, ligne, colonne, oracle, bilan):
+        """
+        Retire une case si la grille garde une solution unique, sinon la note comme nécessaire
+
+        Parameters
+        ----------
+        grille : Grille
+            Grille en cours de vidage
+        ligne : int
+            Indice de ligne
+        colonne : int
+            Indice de colonne
+        oracle : OracleUnicite ou None
+            Oracle d'unicité (None pour compter les solutions avec self.moteur)
+        bilan : dict
+            Bilan du retrait, mis à jour
+
+        Returns
+        -------
+        bool
+            True si la case a été retirée, False sinon
+
+        """
+        bilan["essayees"] += 1
+        if oracle is not None:
+            noeuds_avant = oracle.noeuds
+            accepte = oracle.retirer_si_unique(ligne, colonne)
+            noeuds = oracle.noeuds - noeuds_avant
+            if accepte:
+                grille._effacer(ligne, colonne)
+                grille.bloquer(ligne, colonne, False)
+        else:
+            valeur_sauv = grille.grille[ligne, colonne]
+            grille._effacer(ligne, colonne)
+            grille.bloquer(ligne, colonne, False)
+            
+            copie = Grille(grille.taille)
+            copie.en_matrice(cp.deepcopy(grille.grille))
+            resolveur = self.moteur(copie)
+            accepte = self._compter_solutions(resolveur, limite=2) == 1
+            noeuds = resolveur.noeuds
+            
+            if not accepte:
+                grille._poser(ligne, colonne, valeur_sauv)
+                grille.bloquer(ligne, colonne)
+        if not accepte:
+            bilan["necessaires"].append((ligne, colonne))
+        if self.instrumentation is not None:
+            self._suivre_retrait(ligne, colonne, accepte, noeuds)
+        return accepte
+    
+    def _suivre_retrait(self, ligne, colonne, accepte, noeuds):
+        #Met à jour l'instrumentation après une tentative de retrait
+        instrumentation = self.instrumentation
+        instrumentation.verifications_unicite += 1
+        instrumentation.noeuds_unicite += noeuds
+        if accepte:
+            instrumentation.retraits_acceptes += 1
+        else:
+            instrumentation.retraits_rejetes += 1
+        instrumentation.evenement("retrait", ligne=ligne, colonne=colonne, accepte=accepte, noeuds=noeuds)
+    
+    def _compter_solutions(self, resolveur, limite=2):
+        """
+        Compte le nombre de solutions possibles pour une grille donnée
+
+        Parameters
+        ----------
+        resolveur : ResolveurSudoku ou ResolveurDLX
+            Objet servant à résoudre la grille
+        limite : int, optional
+            Nombre maximal de solutions à chercher avant d'arrêter. La valeur par défaut est 2
+
+        Returns
+        -------
+        int
+            Nombre de solutions trouvées
+
+        """
+        return resolveur.compter_solutions(limite)
+
+
+
+class OracleUnicite():
+    """
+    Vérifie rapidement qu'une grille garde une solution unique lorsqu'on lui retire une case
+    
+    L'oracle part de la grille complète (la solution) et conserve un unique état mutable
+    (valeurs et masques de chiffres) tout au long des retraits : aucune grille n'est recopiée.
+    Avant un retrait la solution est unique, donc toute autre solution doit différer de la solution
+    connue sur la case retirée. Il suffit donc de chercher une solution où cette case prend
+    une autre valeur : la recherche s'arrête dès qu'on en trouve une.
+    
+    Attributs
+    ---------
+    taille : int
+        Taille de la grille
+    solution : list[int]
+        Solution connue, à plat (indice = ligne * taille + colonne)
+    valeurs : list[int]
+        Valeurs actuelles de la grille, à plat (0 = case retirée)
+    noeuds : int
+        Nombre total de nœuds explorés par l'oracle
+    budget : int ou None
+        Nombre maximal de nœuds par vérification. Au-delà, le retrait est refusé par prudence
+        (la grille reste à solution unique, mais on retire moins de cases)
+    
+    """
+    def __init__(self, solution, budget=None):
+        """
+        Initialise l'oracle à partir de la grille complète
+
+        Parameters
+        ----------
+        solution : np.ndarray
+            Grille complète et valide (tableau 2D)
+        budget : int, optional
+            Nombre maximal de nœuds par vérification. Par défaut, aucune limite
+
+        """
+        self.taille = len(solution)
+        self.solution = [int(v) for v in np.asarray(solution).ravel()]
+        self.valeurs = list(self.solution)
+        self.noeuds = 0
+        self.budget = budget
+        self._limite = None
+        n = int(round(self.taille ** 0.5))
+        self._positions = [(i // self.taille, i % self.taille, n * (i // (n * self.taille)) + (i % self.taille) // n)
+                           for i in range(self.taille * self.taille)]
+        self._plein = (1 << (self.taille + 1)) - 2
+        self._lignes = [self._plein] * self.taille
+        self._colonnes = [self._plein] * self.taille
+        self._carres = [self._plein] * self.taille
+        self._vides = []
+    
+    def _retirer(self, case):
+        ligne, colonne, carre = self._positions[case]
+        bit = ~(1 << self.valeurs[case])
+        self._lignes[ligne] &= bit
+        self._colonnes[colonne] &= bit
+        self._carres[carre] &= bit
+        self.valeurs[case] = 0
+    
+    def _placer(self, case, valeur):
+        ligne, colonne, carre = self._positions[case]
+        bit = 1 << valeur
+        self._lignes[ligne] |= bit
+        self._colonnes[colonne] |= bit
+        self._carres[carre] |= bit
+        self.valeurs[case] = valeur
+    
+    def retirer_si_unique(self, ligne, colonne):
+        """
+        Retire une case si la grille garde une solution unique, sinon la laisse en place
+
+        Parameters
+        ----------
+        ligne : int
+            Indice de ligne (0-8)
+        colonne : int
+            Indice de colonne (0-8)
+
+        Returns
+        -------
+        bool
+            True si la case a été retirée, False sinon
+
+        """
+        case = ligne * self.taille + colonne
+        if self.valeurs[case] == 0:
+            return False
+        self._retirer(case)
+        self._vides.append(case)
+        if self._existe_autre_solution(case):
+            self._vides.pop()
+            self._placer(case, self.solution[case])
+            return False
+        return True
+    
+    def remettre(self, ligne, colonne):
+        """
+        Remet dans la grille une case retirée (avec sa valeur de la solution)
+
+        Parameters
+        ----------
+        ligne : int
+            Indice de ligne (0-8)
+        colonne : int
+            Indice de colonne (0-8)
+
+        """
+        case = ligne * self.taille + colonne
+        if self.valeurs[case] == 0:
+            self._vides.remove(case)
+            self._placer(case, self.solution[case])
+    
+    def _existe_autre_solution(self, case_retiree):
+        """
+        Cherche une solution dans laquelle la case retirée ne prend pas sa valeur de la solution
+
+        """
+        self._interdit = (case_retiree, 1 << self.solution[case_retiree])
+        self._limite = None if self.budget is None else self.noeuds + self.budget
+        return self._chercher(self._vides)
+    
+    def _chercher(self, vides):
+        """
+        Recherche en profondeur (case la plus contrainte d'abord) d'une solution.
+        L'état est toujours restauré avant de rendre la main.
+
+        Parameters
+        ----------
+        vides : list[int]
+            Cases encore vides
+
+        Returns
+        -------
+        bool
+            True si une solution existe
+
+        """
+        self.noeuds += 1
+        if not vides:
+            return True
+        if self._limite is not None and self.noeuds > self._limite:
+            #Budget épuisé : on fait comme si une autre solution existait (refus prudent)
+            return True
+        lignes, colonnes, carres, positions = self._lignes, self._colonnes, self._carres, self._positions
+        case_interdite, bit_interdit = self._interdit
+        plein = self._plein
+        choisie, choix, minimum = -1, 0, self.taille + 1
+        for case in vides:
+            ligne, colonne, carre = positions[case]
+            masque = ~(lignes[ligne] | colonnes[colonne] | carres[carre]) & plein
+            if case == case_interdite:
+                masque &= ~bit_interdit
+            if not masque:
+                return False
+            if not masque & (masque - 1):
+                choisie, choix = case, masque
+                break
+            nombre = bin(masque).count("1")
+            if nombre < minimum:
+                choisie, choix, minimum = case, masque, nombre
+        
+        reste = [case for case in vides if case != choisie]
+        while choix:
+            bit = choix & -choix
+            choix ^= bit
+            self._placer(choisie, bit.bit_length() - 1)
+            trouve = self._chercher(reste)
+            self._retirer(choisie)
+            if trouve:
+                return True
+        return False
+
+
+
+class _BudgetEpuise(Exception):
+    #Levée au fond de la recherche quand le budget de nœuds ou de temps est dépassé
+    pass
+
+
+class ResultatComptage():
+    """
+    Résultat d'un comptage de solutions avec budget (voir ResolveurSudoku.compter)
+    
+    Attributs
+    ---------
+    solutions : int
+        Nombre de solutions trouvées (au plus la limite demandée)
+    limite : int ou None
+        Nombre de solutions à partir duquel la recherche s'est arrêtée (None : pas de limite)
+    epuise : bool
+        True si la recherche a été interrompue faute de budget : le nombre de solutions
+        est alors un minimum, pas un résultat définitif
+    noeuds : int
+        Nombre de nœuds explorés
+    duree : float
+        Durée de la recherche en secondes
+    
+    """
+    __slots__ = ("solutions", "limite", "epuise", "noeuds", "duree")
+    
+    def __init__(self, solutions, limite, epuise, noeuds, duree):
+        self.solutions = solutions
+        self.limite = limite
+        self.epuise = epuise
+        self.noeuds = noeuds
+        self.duree = duree
+    
+    @property
+    def statut(self):
+        """
+        Conclusion du comptage
+
+        Returns
+        -------
+        str
+            "budget_epuise" (recherche interrompue avant la limite : le nombre de solutions
+            n'est qu'un minimum), "multiple" (au moins deux solutions), "aucune", "unique",
+            ou "resoluble" (une solution trouvée, avec une limite de 1)
+
+        """
+        if self.epuise and (self.limite is None or self.solutions < self.limite):
+            return "budget_epuise"
+        if self.solutions >= 2:
+            return "multiple"
+        if self.solutions == 0:
+            return "aucune"
+        return "resoluble" if self.limite == 1 else "unique"
+    
+    def __repr__(self):
+        return (f"ResultatComptage(solutions={self.solutions}, statut={self.statut!r}, "
+                f"noeuds={self.noeuds}, duree={self.duree:.4f})")
+
+
+class ResolveurSudoku():
+    """
+    Résout une grille de sudoku donnée à l'aide d'un algorithme récursif
+    
+    Deux stratégies sont disponibles :
+        - "mrv" : branche sur la case ayant le moins de candidats, après avoir propagé
+          les singletons nus et cachés (stratégie par défaut)
+        - "naif" : parcourt les cases vides dans l'ordre de lecture (stratégie de référence)
+    
+    Attributs
+    ---------
+    grille : Grille
+        Grille de sudoku à résoudre
+    strategie : str
+        Stratégie de recherche ("mrv" ou "naif")
+    noeuds : int
+        Nombre de nœuds explorés lors de la dernière résolution
+    solutions : int
+        Nombre de solutions trouvées lors de la dernière résolution
+    epuise : bool
+        True si la dernière énumération a été interrompue faute de budget
+    instrumentation : Instrumentation ou None
+        Compteurs et crochets de suivi (None pour désactiver le suivi)
+    
+    """
+    STRATEGIES = ("mrv", "naif")
+    
+    def __init__(self, grille, strategie="mrv", instrumentation=None, aleatoire=None):
+        """
+        Initialise le résolveur
+
+        Parameters
+        ----------
+        grille : grille
+            Grille à résoudre
+        strategie : str, optional
+            Stratégie de recherche ("mrv" ou "naif"). La valeur par défaut est "mrv"
+        instrumentation : Instrumentation, optional
+            Compteurs et crochets de suivi. Par défaut, aucun suivi
+        aleatoire : random.Random, optional
+            Si donné, les chiffres sont essayés dans un ordre aléatoire (stratégie "mrv" seulement),
+            ce qui permet de générer des grilles pleines variées
+
+        """
+        if strategie not in self.STRATEGIES:
+            raise ValueError(f"Stratégie inconnue : {strategie} (attendu : {', '.join(self.STRATEGIES)})")
+        self.grille = grille
+        self.strategie = strategie
+        self.instrumentation = instrumentation
+        self.aleatoire = aleatoire
+        self.noeuds = 0
+        self.solutions = 0
+        self.epuise = False
+        #(nombre maximal de nœuds, échéance en secondes) pendant une énumération avec budget
+        self._budget = None
+    
+    def resoudre(self):
+        """
+        Résout la grille de sudoku
+
+        Returns
+        -------
+        bool
+            True si la grille a été résolue, False sinon
+
+        """
+        self.noeuds = 0
+        self.solutions = 0
+        #Même vérification des cases données pour toutes les stratégies : une grille mal formée n'a pas de solution
+        vides = self._cases_vides()
+        if vides is None:
+            return False
+        if self.strategie == "naif":
+            return self._explorer_naif(1, True)
+        return self._explorer_mrv(vides, 1, True)
+    
+    def compter_solutions(self, limite=2):
+        """
+        Compte les solutions de la grille sans la modifier
+
+        Parameters
+        ----------
+        limite : int, optional
+            Nombre maximal de solutions à chercher avant d'arrêter. La valeur par défaut est 2
+
+        Returns
+        -------
+        int
+            Nombre de solutions trouvées (au plus limite)
+
+        """
+        self.noeuds = 0
+        self.solutions = 0
+        vides = self._cases_vides()
+        if vides is None:
+            return 0
+        if self.strategie == "naif":
+            self._explorer_naif(limite, False)
+        else:
+            self._explorer_mrv(vides, limite, False)
+        return self.solutions
+    
+    def enumerer_solutions(self, noeuds_max=None, duree_max=None):
+        """
+        Énumère les solutions de la grille une à une, à la demande. La grille est remise dans
+        son état initial à la fin de l'énumération, ou dès que l'itérateur est abandonné (close)
+
+        Si le budget est dépassé, l'énumération s'arrête sans erreur et l'attribut epuise passe à True.
+        Une grille mal formée (doublons, case vide bloquée) n'a aucune solution.
+
+        Parameters
+        ----------
+        noeuds_max : int, optional
+            Nombre maximal de nœuds explorés. Par défaut, pas de limite
+        duree_max : float, optional
+            Durée maximale en secondes, comptée à partir de la première solution demandée.
+            Par défaut, pas de limite
+
+        Yields
+        ------
+        np.ndarray
+            Copie de chaque solution trouvée
+
+        """
+        self.noeuds = 0
+        self.solutions = 0
+        self.epuise = False
+        vides = self._cases_vides()
+        if vides is None:
+            return
+        self._budget = (noeuds_max, None if duree_max is None else time.perf_counter() + duree_max)
+        try:
+            if self.strategie == "naif":
+                yield from self._enumerer_naif()
+            else:
+                yield from self._enumerer_mrv(vides)
+        except _BudgetEpuise:
+            self.epuise = True
+        finally:
+            self._budget = None
+    
+    def compter(self, limite=2, noeuds_max=None, duree_max=None):
+        """
+        Compte les solutions de la grille sans la modifier, avec un budget de nœuds et de temps :
+        la réponse arrive toujours à temps, même pour une grille quasi vide ou mal formée
+
+        Parameters
+        ----------
+        limite : int, optional
+            Nombre de solutions à partir duquel la recherche s'arrête (None pour tout compter).
+            La valeur par défaut est 2
+        noeuds_max : int, optional
+            Nombre maximal de nœuds explorés. Par défaut, pas de limite
+        duree_max : float, optional
+            Durée maximale en secondes. Par défaut, pas de limite
+
+        Returns
+        -------
+        ResultatComptage
+            Nombre de solutions, et si le budget a été épuisé avant de conclure
+
+        """
+        debut = time.perf_counter()
+        recherche = self.enumerer_solutions(noeuds_max, duree_max)
+        nombre = 0
+        for _ in recherche:
+            nombre += 1
+            if limite is not None and nombre >= limite:
+                break
+        recherche.close()
+        return ResultatComptage(nombre, limite, self.epuise, self.noeuds, time.perf_counter() - debut)
+    
+    def _compter_noeud(self):
+        """
+        Compte un nœud de l'énumération et vérifie le budget
+
+        Raises
+        ------
+        _BudgetEpuise
+            Si le nombre de nœuds ou la durée dépasse le budget
+
+        """
+        self.noeuds += 1
+        if self.instrumentation is not None:
+            self.instrumentation.noeuds += 1
+        noeuds_max, echeance = self._budget
+        if noeuds_max is not None and self.noeuds > noeuds_max:
+            raise _BudgetEpuise()
+        if echeance is not None and time.perf_counter() > echeance:
+            raise _BudgetEpuise()
+    
+    def _enumerer_naif(self):
+        """
+        Version génératrice de _explorer_naif : chaque case posée est effacée à la sortie,
+        y compris quand l'énumération est interrompue
+
+        Yields
+        ------
+        np.ndarray
+            Copie de chaque solution trouvée
+
+        """
+        self._compter_noeud()
+        instrumentation = self.instrumentation
+        vide = self.grille.case_vide()
+        if not vide:
+            self.solutions += 1
+            yield self.grille.grille.copy()
+            return
+        ligne, colonne = vide
+        
+        for chiffre in range(1, self.grille.taille + 1):
+            if instrumentation is not None:
+                instrumentation.appels_est_correct += 1
+            if self.grille.est_correct(ligne, colonne, chiffre):
+                self.grille._poser(ligne, colonne, chiffre)
+                try:
+                    yield from self._enumerer_naif()
+                finally:
+                    self.grille._effacer(ligne, colonne)
+                if instrumentation is not None:
+                    instrumentation.retours_arriere += 1
+                    instrumentation.evenement("retour_arriere", ligne=ligne, colonne=colonne)
+    
+    def _enumerer_mrv(self, vides):
+        """
+        Version génératrice de _explorer_mrv : les cases posées (par propagation ou par branchement)
+        sont effacées à la sortie, y compris quand l'énumération est interrompue
+
+        Parameters
+        ----------
+        vides : list[tuple(int, int, int)]
+            Cases encore vides à ce niveau de la recherche
+
+        Yields
+        ------
+        np.ndarray
+            Copie de chaque solution trouvée
+
+        """
+        self._compter_noeud()
+        instrumentation = self.instrumentation
+        posees = []
+        try:
+            restantes = self._propager(vides, posees)
+            if restantes is None:
+                return
+            if not restantes:
+                self.solutions += 1
+                yield self.grille.grille.copy()
+                return
+            
+            #Case ayant le moins de candidats
+            meilleure = min(restantes, key=lambda case: bin(case[3]).count("1"))
+            ligne, colonne, carre, masque = meilleure
+            suite = [case[:3] for case in restantes if case is not meilleure]
+            if instrumentation is not None:
+                instrumentation.evenement("branchement", ligne=ligne, colonne=colonne, candidats=bin(masque).count("1"))
+            chiffres = [chiffre for chiffre in range(1, self.grille.taille + 1) if (masque >> chiffre) & 1]
+            if self.aleatoire is not None:
+                self.aleatoire.shuffle(chiffres)
+            for chiffre in chiffres:
+                self.grille._poser(ligne, colonne, chiffre)
+                try:
+                    yield from self._enumerer_mrv(suite)
+                finally:
+                    self.grille._effacer(ligne, colonne)
+                if instrumentation is not None:
+                    instrumentation.retours_arriere += 1
+            if instrumentation is not None:
+                instrumentation.evenement("retour_arriere", ligne=ligne, colonne=colonne)
+        finally:
+            self._annuler(posees)
+    
+    def _explorer_naif(self, limite, garder):
+        """
+        Retour sur trace simple : remplit la première case vide trouvée avec chaque chiffre possible
+
+        Parameters
+        ----------
+        limite : int
+            Nombre de solutions à partir duquel la recherche s'arrête
+        garder : bool
+            Si True, la dernière solution trouvée reste écrite dans la grille
+
+        Returns
+        -------
+        bool
+            True si la limite de solutions est atteinte
+
+        """
+        self.noeuds += 1
+        instrumentation = self.instrumentation
+        if instrumentation is not None:
+            instrumentation.noeuds += 1
+        vide = self.grille.case_vide()
+        if not vide:
+            self.solutions += 1
+            return self.solutions >= limite
+        ligne, colonne = vide
+        
+        for chiffre in range(1, self.grille.taille + 1):
+            if instrumentation is not None:
+                instrumentation.appels_est_correct += 1
+            if self.grille.est_correct(ligne, colonne, chiffre):
+                self.grille._poser(ligne, colonne, chiffre)
+                if self._explorer_naif(limite, garder):
+                    if not garder:
+                        self.grille._effacer(ligne, colonne)
+                    return True
+                self.grille._effacer(ligne, colonne)
+                if instrumentation is not None:
+                    instrumentation.retours_arriere += 1
+                    instrumentation.evenement("retour_arriere", ligne=ligne, colonne=colonne)
+        return False
+    
+    def _cases_vides(self):
+        """
+        Liste les cases vides de la grille
+
+        Returns
+        -------
+        list[tuple(int, int, int)] ou None
+            Triplets (ligne, colonne, carré) des cases vides, None si une case vide est bloquée,
+            si une valeur sort de 1..taille ou si la grille contient des doublons
+            (elle n'a alors aucune solution)
+
+        """
+        if self.grille.grille.max(initial=0) > self.grille.taille:
+            return None
+        self.grille._assurer_masques()
+        if self.grille._doublons:
+            return None
+        n = self.grille.taille_carre
+        vides = []
+        for ligne, colonne in np.argwhere(self.grille.grille == 0).tolist():
+            if self.grille.est_bloquee(ligne, colonne):
+                return None
+            vides.append((ligne, colonne, n * (ligne // n) + colonne // n))
+        return vides
+    
+    def _explorer_mrv(self, vides, limite, garder):
+        """
+        Propage les singletons puis branche sur la case la plus contrainte
+
+        Parameters
+        ----------
+        vides : list[tuple(int, int, int)]
+            Cases encore vides à ce niveau de la recherche
+        limite : int
+            Nombre de solutions à partir duquel la recherche s'arrête
+        garder : bool
+            Si True, la dernière solution trouvée reste écrite dans la grille
+
+        Returns
+        -------
+        bool
+            True si la limite de solutions est atteinte. Sinon la grille est remise dans son état initial
+
+        """
+        self.noeuds += 1
+        instrumentation = self.instrumentation
+        if instrumentation is not None:
+            instrumentation.noeuds += 1
+        posees = []
+        restantes = self._propager(vides, posees)
+        if restantes is None:
+            self._annuler(posees)
+            return False
+        if not restantes:
+            self.solutions += 1
+            arret = self.solutions >= limite
+            if not (arret and garder):
+                self._annuler(posees)
+            return arret
+        
+        #Case ayant le moins de candidats
+        meilleure = min(restantes, key=lambda case: bin(case[3]).count("1"))
+        ligne, colonne, carre, masque = meilleure
+        suite = [case[:3] for case in restantes if case is not meilleure]
+        if instrumentation is not None:
+            instrumentation.evenement("branchement", ligne=ligne, colonne=colonne, candidats=bin(masque).count("1"))
+        chiffres = [chiffre for chiffre in range(1, self.grille.taille + 1) if (masque >> chiffre) & 1]
+        if self.aleatoire is not None:
+            self.aleatoire.shuffle(chiffres)
+        for chiffre in chiffres:
+            self.grille._poser(ligne, colonne, chiffre)
+            if self._explorer_mrv(suite, limite, garder):
+                if not garder:
+                    self.grille._effacer(ligne, colonne)
+                    self._annuler(posees)
+                return True
+            self.grille._effacer(ligne, colonne)
+            if instrumentation is not None:
+                instrumentation.retours_arriere += 1
+        if instrumentation is not None:
+            instrumentation.evenement("retour_arriere", ligne=ligne, colonne=colonne)
+        self._annuler(posees)
+        return False
+    
+    def _propager(self, vides, posees):
+        """
+        Place tous les singletons nus (un seul candidat pour la case) et cachés (une seule case
+        possible pour un chiffre dans une ligne, une colonne ou un carré) jusqu'à stabilité
+
+        Parameters
+        ----------
+        vides : list[tuple(int, int, int)]
+            Cases vides à examiner
+        posees : list[tuple(int, int)]
+            Liste complétée avec les cases remplies par la propagation
+
+        Returns
+        -------
+        list[tuple(int, int, int, int)] ou None
+            Cases encore vides avec leur masque de candidats, None en cas de contradiction
+
+        """
+        grille = self.grille
+        lignes, colonnes, carres = grille.masques_lignes, grille.masques_colonnes, grille.masques_carres
+        plein = (1 << (grille.taille + 1)) - 2
+        while True:
+            #Singletons nus
+            restantes = []
+            for ligne, colonne, carre in vides:
+                masque = ~(lignes[ligne] | colonnes[colonne] | carres[carre]) & plein
+                if not masque:
+                    return None
+                if masque & (masque - 1):
+                    restantes.append((ligne, colonne, carre, masque))
+                else:
+                    grille._poser(ligne, colonne, masque.bit_length() - 1)
+                    posees.append((ligne, colonne))
+            if len(restantes) != len(vides):
+                vides = [case[:3] for case in restantes]
+                continue
+            
+            #Singletons cachés : un chiffre qui n'a qu'une place dans une unité
+            unites = [[] for i in range(3 * grille.taille)]
+            for case in restantes:
+                unites[case[0]].append(case)
+                unites[grille.taille + case[1]].append(case)
+                unites[2 * grille.taille + case[2]].append(case)
+            progres = False
+            for indice, unite in enumerate(unites):
+                if not unite:
+                    continue
+                une_fois = plusieurs_fois = 0
+                for case in unite:
+                    plusieurs_fois |= une_fois & case[3]
+                    une_fois |= case[3]
+                if indice < grille.taille:
+                    presents = lignes[indice]
+                elif indice < 2 * grille.taille:
+                    presents = colonnes[indice - grille.taille]
+                else:
+                    presents = carres[indice - 2 * grille.taille]
+                if plein & ~presents & ~une_fois:
+                    #Un chiffre manquant ne peut plus être placé nulle part dans l'unité
+                    return None
+                uniques = une_fois & ~plusieurs_fois
+                while uniques:
+                    bit = uniques & -uniques
+                    uniques ^= bit
+                    for ligne, colonne, carre, masque in unite:
+                        if masque & bit:
+                            valeur = grille.grille[ligne, colonne]
+                            if valeur == bit.bit_length() - 1:
+                                #Déjà placé via une autre unité
+                                break
+                            if valeur != 0 or (lignes[ligne] | colonnes[colonne] | carres[carre]) & bit:
+                                return None
+                            grille._poser(ligne, colonne, bit.bit_length() - 1)
+                            posees.append((ligne, colonne))
+                            progres = True
+                            break
+            if not progres:
+                return restantes
+            vides = [case[:3] for case in restantes if grille.grille[case[0], case[1]] == 0]
+    
+    def _annuler(self, posees):
+        """
+        Vide les cases remplies par la propagation
+
+        """
+        for ligne, colonne in posees:
+            self.grille._effacer(ligne, colonne)
+
+
+
+class ResolveurDLX():
+    """
+    Résout une grille de sudoku en la modélisant comme un problème de couverture exacte,
+    résolu par l'algorithme X de Knuth avec les liens dansants (Dancing Links)
+    
+    Chaque candidat (ligne, colonne, chiffre) est une rangée de la matrice, qui couvre 4 contraintes :
+    la case est remplie, et le chiffre est présent dans la ligne, la colonne et le carré.
+    À chaque nœud, on branche sur la contrainte ayant le moins de rangées possibles.
+    
+    Attributs
+    ---------
+    grille : Grille
+        Grille de sudoku à résoudre
+    noeuds : int
+        Nombre de nœuds explorés lors de la dernière résolution
+    solutions : int
+        Nombre de solutions trouvées lors de la dernière résolution
+    
+    """
+    def __init__(self, grille):
+        """
+        Initialise le résolveur
+
+        Parameters
+        ----------
+        grille : Grille
+            Grille à résoudre
+
+        """
+        self.grille = grille
+        self.noeuds = 0
+        self.solutions = 0
+    
+    def resoudre(self):
+        """
+        Résout la grille de sudoku
+
+        Returns
+        -------
+        bool
+            True si la grille a été résolue, False sinon
+
+        """
+        solution = self._chercher(1)
+        if solution is None:
+            return False
+        taille = self.grille.taille
+        for candidat in solution:
+            ligne, reste = divmod(candidat, taille * taille)
+            colonne, chiffre = divmod(reste, taille)
+            if self.grille.grille[ligne, colonne] == 0:
+                self.grille._poser(ligne, colonne, chiffre + 1)
+        return True
+    
+    def compter_solutions(self, limite=2):
+        """
+        Compte les solutions de la grille sans la modifier
+
+        Parameters
+        ----------
+        limite : int, optional
+            Nombre maximal de solutions à chercher avant d'arrêter. La valeur par défaut est 2
+
+        Returns
+        -------
+        int
+            Nombre de solutions trouvées (au plus limite)
+
+        """
+        self._chercher(limite)
+        return self.solutions
+    
+    def _construire(self):
+        """
+        Construit la matrice creuse de couverture exacte puis sélectionne les chiffres déjà placés
+
+        Returns
+        -------
+        tuple ou None
+            Tableaux de liens (gauche, droite, haut, bas, colonne, taille des colonnes, candidat de chaque nœud),
+            None si les chiffres déjà placés sont incompatibles
+
+        """
+        taille = self.grille.taille
+        nb_cases = taille * taille
+        nb_colonnes = 4 * nb_cases
+        #Nœud 0 : racine, nœuds 1..nb_colonnes : en-têtes de colonnes
+        gauche = list(range(-1, nb_colonnes))
+        gauche[0] = nb_colonnes
+        droite = list(range(1, nb_colonnes + 2))
+        droite[nb_colonnes] = 0
+        haut = list(range(nb_colonnes + 1))
+        bas = list(range(nb_colonnes + 1))
+        colonne_de = list(range(nb_colonnes + 1))
+        candidat_de = [-1] * (nb_colonnes + 1)
+        effectif = [0] * (nb_colonnes + 1)
+        premier_noeud = {}
+        
+        valeurs = self.grille.grille.astype(int).tolist()
+        for ligne in range(taille):
+            for colonne in range(taille):
+                if valeurs[ligne][colonne] == 0 and self.grille.est_bloquee(ligne, colonne):
+                    return None
+                carre = self.grille.taille_carre * (ligne // self.grille.taille_carre) + colonne // self.grille.taille_carre
+                for chiffre in range(taille):
+                    candidat = ligne * nb_cases + colonne * taille + chiffre
+                    contraintes = (1 + ligne * taille + colonne,
+                                   1 + nb_cases + ligne * taille + chiffre,
+                                   1 + 2 * nb_cases + colonne * taille + chiffre,
+                                   1 + 3 * nb_cases + carre * taille + chiffre)
+                    debut = len(gauche)
+                    premier_noeud[candidat] = debut
+                    for k, entete in enumerate(contraintes):
+                        noeud = debut + k
+                        gauche.append(debut + (k - 1) % 4)
+                        droite.append(debut + (k + 1) % 4)
+                        haut.append(haut[entete])
+                        bas.append(entete)
+                        bas[haut[entete]] = noeud
+                        haut[entete] = noeud
+                        colonne_de.append(entete)
+                        candidat_de.append(candidat)
+                        effectif[entete] += 1
+        
+        liens = (gauche, droite, haut, bas, colonne_de, effectif, candidat_de)
+        couvertes = set()
+        for ligne in range(taille):
+            for colonne in range(taille):
+                valeur = valeurs[ligne][colonne]
+                if valeur == 0:
+                    continue
+                if not 1 <= valeur <= taille:
+                    return None
+                debut = premier_noeud[ligne * nb_cases + colonne * taille + valeur - 1]
+                for noeud in range(debut, debut + 4):
+                    if colonne_de[noeud] in couvertes:
+                        return None
+                    couvertes.add(colonne_de[noeud])
+                    self._couvrir(liens, colonne_de[noeud])
+        return liens
+    
+    @staticmethod
+    def _couvrir(liens, entete):
+        """
+        Retire une colonne et toutes les rangées qui la couvrent
+
+        """
+        gauche, droite, haut, bas, colonne_de, effectif, candidat_de = liens
+        droite[gauche[entete]] = droite[entete]
+        gauche[droite[entete]] = gauche[entete]
+        i = bas[entete]
+        while i != entete:
+            j = droite[i]
+            while j != i:
+                bas[haut[j]] = bas[j]
+                haut[bas[j]] = haut[j]
+                effectif[colonne_de[j]] -= 1
+                j = droite[j]
+            i = bas[i]
+    
+    @staticmethod
+    def _decouvrir(liens, entete):
+        """
+        Réinsère une colonne retirée par _couvrir (dans l'ordre inverse)
+
+        """
+        gauche, droite, haut, bas, colonne_de, effectif, candidat_de = liens
+        i = haut[entete]
+        while i != entete:
+            j = gauche[i]
+            while j != i:
+                effectif[colonne_de[j]] += 1
+                bas[haut[j]] = j
+                haut[bas[j]] = j
+                j = gauche[j]
+            i = haut[i]
+        droite[gauche[entete]] = entete
+        gauche[droite[entete]] = entete
+    
+    def _chercher(self, limite):
+        """
+        Lance l'algorithme X jusqu'à trouver limite solutions
+
+        Parameters
+        ----------
+        limite : int
+            Nombre de solutions à partir duquel la recherche s'arrête
+
+        Returns
+        -------
+        list[int] ou None
+            Candidats choisis pour la première solution trouvée, None s'il n'y en a pas
+
+        """
+        self.noeuds = 0
+        self.solutions = 0
+        liens = self._construire()
+        if liens is None:
+            return None
+        gauche, droite, haut, bas, colonne_de, effectif, candidat_de = liens
+        couvrir, decouvrir = self._couvrir, self._decouvrir
+        pile = []
+        premiere = []
+        
+        def explorer():
+            self.noeuds += 1
+            if droite[0] == 0:
+                self.solutions += 1
+                if not premiere:
+                    premiere.extend(pile)
+                return self.solutions >= limite
+            #Colonne la moins remplie
+            entete = droite[0]
+            choisie, minimum = entete, effectif[entete]
+            while entete != 0 and minimum > 1:
+                if effectif[entete] < minimum:
+                    choisie, minimum = entete, effectif[entete]
+                entete = droite[entete]
+            if minimum == 0:
+                return False
+            
+            couvrir(liens, choisie)
+            i = bas[choisie]
+            while i != choisie:
+                pile.append(candidat_de[i])
+                j = droite[i]
+                while j != i:
+                    couvrir(liens, colonne_de[j])
+                    j = droite[j]
+                arret = explorer()
+                j = gauche[i]
+                while j != i:
+                    decouvrir(liens, colonne_de[j])
+                    j = gauche[j]
+                pile.pop()
+                if arret:
+                    decouvrir(liens, choisie)
+                    return True
+                i = bas[i]
+            decouvrir(liens, choisie)
+            return False
+        
+        explorer()
+        if self.solutions == 0:
+            return None
+        return premiere
+
+
+
+class ResolveurLot():
+    """
+    Résout un grand nombre de grilles à la fois avec des opérations NumPy vectorisées
+    
+    Les candidats de toutes les grilles sont stockés dans un tableau booléen (N, cases, chiffres).
+    L'élimination des candidats et les singletons nus et cachés sont appliqués à toutes les grilles
+    en même temps jusqu'à stabilité. Seules les grilles encore incomplètes sont ensuite
+    résolues une par une par un ResolveurSudoku.
+    
+    Attributs
+    ---------
+    puzzles : np.ndarray
+        Grilles à résoudre, de forme (N, taille, taille) (0 = case vide)
+    taille_bloc : int
+        Nombre de grilles traitées ensemble (borne la mémoire utilisée)
+    par_propagation : int
+        Nombre de grilles résolues par la seule propagation lors de la dernière résolution
+    par_recherche : int
+        Nombre de grilles qui ont nécessité une recherche lors de la dernière résolution
+    
+    """
+    def __init__(self, puzzles, taille_bloc=4096):
+        """
+        Initialise le résolveur
+
+        Parameters
+        ----------
+        puzzles : np.ndarray
+            Grilles à résoudre, de forme (N, taille, taille)
+        taille_bloc : int, optional
+            Nombre de grilles traitées ensemble. La valeur par défaut est 4096
+
+        """
+        self.puzzles = np.asarray(puzzles, dtype=np.uint8)
+        self.taille_bloc = taille_bloc
+        self.par_propagation = 0
+        self.par_recherche = 0
+        
+        taille = self.puzzles.shape[-1]
+        n = int(round(taille ** 0.5))
+        indices = np.arange(taille * taille).reshape(taille, taille)
+        carres = indices.reshape(n, n, n, n).transpose(0, 2, 1, 3).reshape(taille, taille)
+        #Unités (lignes, colonnes, carrés) : chacune est une permutation des cases
+        self._unites = (indices, indices.T, carres)
+    
+    def resoudre(self):
+        """
+        Résout toutes les grilles
+
+        Returns
+        -------
+        solutions : np.ndarray
+            Grilles complétées, de forme (N, taille, taille) (les grilles sans solution restent incomplètes)
+        resolus : np.ndarray
+            Tableau booléen (N,) indiquant les grilles résolues
+
+        """
+        self.par_propagation = 0
+        self.par_recherche = 0
+        nombre, taille = len(self.puzzles), self.puzzles.shape[-1]
+        solutions = self.puzzles.copy()
+        resolus = np.zeros(nombre, dtype=bool)
+        for debut in range(0, nombre, self.taille_bloc):
+            bloc = slice(debut, debut + self.taille_bloc)
+            valeurs, etat = self._propager(self.puzzles[bloc].reshape(-1, taille * taille))
+            solutions[bloc] = valeurs.reshape(-1, taille, taille)
+            resolus[bloc] = etat == 1
+            self.par_propagation += int((etat == 1).sum())
+            #Repli sur la recherche pour les grilles bloquées
+            for indice in np.flatnonzero(etat == 0) + debut:
+                grille = Grille.depuis_tableau(solutions[indice].copy())
+                self.par_recherche += 1
+                if ResolveurSudoku(grille).resoudre():
+                    solutions[indice] = grille.grille
+                    resolus[indice] = True
+        return solutions, resolus
+    
+    def _propager(self, puzzles):
+        """
+        Propage les contraintes sur un bloc de grilles. Les candidats de chaque case sont
+        représentés par un masque de bits (bit i-1 pour le chiffre i)
+
+        Parameters
+        ----------
+        puzzles : np.ndarray
+            Bloc de grilles à plat, de forme (N, cases)
+
+        Returns
+        -------
+        valeurs : np.ndarray
+            Valeurs déduites, de forme (N, cases)
+        etat : np.ndarray
+            Pour chaque grille : 1 si elle est résolue, 0 s'il faut chercher, -1 si elle est contradictoire
+
+        """
+        taille = self._unites[0].shape[0]
+        plein = np.uint32((1 << taille) - 1)
+        puzzles = puzzles.astype(np.uint32)
+        candidats = np.where(puzzles == 0, plein, np.left_shift(np.uint32(1), puzzles - 1, dtype=np.uint32))
+        etat = np.zeros(len(puzzles), dtype=np.int8)
+        actives = np.arange(len(puzzles))
+        
+        while len(actives):
+            cand = candidats[actives]
+            avant = cand.copy()
+            seuls = (cand & (cand - 1)) == 0
+            contradiction = (cand == 0).any(axis=1)
+            
+            #Élimination : un chiffre placé est retiré des candidats des autres cases de ses unités
+            fixes = np.where(seuls, cand, 0)
+            interdits = np.zeros_like(cand)
+            for unites in self._unites:
+                une_fois, plusieurs_fois = self._compter_bits(fixes[:, unites])
+                contradiction |= (plusieurs_fois != 0).any(axis=1)
+                interdits[:, unites] |= une_fois[:, :, None]
+            cand = np.where(seuls, cand, cand & ~interdits)
+            
+            #Singletons cachés : un chiffre qui n'a qu'une case possible dans une unité
+            caches = np.zeros_like(cand)
+            for unites in self._unites:
+                dans_unite = cand[:, unites]
+                une_fois, plusieurs_fois = self._compter_bits(dans_unite)
+                contradiction |= (une_fois != plein).any(axis=1)
+                caches[:, unites] |= dans_unite & (une_fois & ~plusieurs_fois)[:, :, None]
+            contradiction |= ((caches & (caches - 1)) != 0).any(axis=1)
+            cand = np.where(caches != 0, caches, cand)
+            
+            contradiction |= (cand == 0).any(axis=1)
+            candidats[actives] = cand
+            complete = ((cand & (cand - 1)) == 0).all(axis=1) & ~contradiction
+            bloquee = (cand == avant).all(axis=1) & ~complete & ~contradiction
+            etat[actives[contradiction]] = -1
+            etat[actives[complete]] = 1
+            actives = actives[~(contradiction | complete | bloquee)]
+        
+        seuls = (candidats != 0) & ((candidats & (candidats - 1)) == 0)
+        valeurs = np.where(seuls, np.log2(np.maximum(candidats, 1)).astype(np.uint8) + 1, 0)
+        return valeurs.astype(np.uint8), etat
+    
+    @staticmethod
+    def _compter_bits(masques):
+        """
+        Pour chaque unité, calcule les chiffres présents au moins une fois et au moins deux fois
+
+        Parameters
+        ----------
+        masques : np.ndarray
+            Masques des cases de chaque unité, de forme (N, unités, cases par unité)
+
+        Returns
+        -------
+        tuple(np.ndarray, np.ndarray)
+            Masques (N, unités) des chiffres vus au moins une fois, et au moins deux fois
+
+        """
+        une_fois = np.zeros(masques.shape[:2], dtype=masques.dtype)
+        plusieurs_fois = np.zeros_like(une_fois)
+        for case in range(masques.shape[2]):
+            plusieurs_fois |= une_fois & masques[:, :, case]
+            une_fois |= masques[:, :, case]
+        return une_fois, plusieurs_fois
+
+
+
+_VOISINAGES = {}
+
+def _voisinage(taille):
+    """
+    Indices (à plat) des cases de la ligne, de la colonne et du carré de chaque case, elle comprise,
+    mis en cache par taille
+
+    Returns
+    -------
+    np.ndarray
+        Tableau (taille * taille, 3 * taille - 2 * n), n étant la taille des carrés
+
+    """
+    if taille not in _VOISINAGES:
+        n = int(round(taille ** 0.5))
+        lignes, colonnes = np.divmod(np.arange(taille * taille), taille)
+        carres = n * (lignes // n) + colonnes // n
+        memes = (lignes[:, None] == lignes) | (colonnes[:, None] == colonnes) | (carres[:, None] == carres)
+        _VOISINAGES[taille] = np.nonzero(memes)[1].reshape(taille * taille, -1)
+    return _VOISINAGES[taille]
+
+
+class JournalCoups():
+    """
+    Journal des coups d'une partie, pour annuler, refaire et rejouer les coups.
+    
+    Chaque changement élémentaire est un enregistrement de 32 bits :
+        - bit 31 : "suite", à 1 si l'enregistrement fait partie du même coup que le précédent
+        - bit 30 : type (0 = valeur d'une case, 1 = bascule d'une annotation)
+        - bits 20 à 29 : indice de la case (ligne * taille + colonne)
+        - bits 5 à 9 : ancienne valeur (type valeur)
+        - bits 0 à 4 : nouvelle valeur (type valeur) ou chiffre annoté (type annotation)
+    Un coup est un enregistrement suivi de ses enregistrements "suite" (par exemple les annotations
+    effacées par un placement). Annuler ou refaire un coup n'applique que ces différences.
+    
+    Attributs
+    ---------
+    enregistrements : array
+        Enregistrements de tous les coups, y compris ceux annulés qui peuvent encore être refaits
+    debuts : array
+        Indice du premier enregistrement de chaque coup
+    coup : int
+        Nombre de coups actuellement appliqués
+    
+    """
+    SIGNATURE = b"SDKJ"
+    VERSION = 1
+    _ENTETE = struct.Struct("<4sHxxII")
+    VALEUR = 0
+    ANNOTATION = 1
+    _SUITE = 1 << 31
+    
+    def __init__(self):
+        self.enregistrements = array("I")
+        self.debuts = array("I")
+        self.coup = 0
+    
+    def __len__(self):
+        return len(self.debuts)
+    
+    @staticmethod
+    def valeur(case, ancienne, nouvelle):
+        """
+        Enregistrement d'un changement de valeur d'une case
+        
+        """
+        return case << 20 | ancienne << 5 | nouvelle
+    
+    @staticmethod
+    def annotation(case, chiffre):
+        """
+        Enregistrement de la bascule d'une annotation (son propre inverse)
+        
+        """
+        return 1 << 30 | case << 20 | chiffre
+    
+    @staticmethod
+    def decoder(enregistrement):
+        """
+        Décode un enregistrement
+
+        Parameters
+        ----------
+        enregistrement : int
+            Enregistrement de 32 bits
+
         Returns
         -------
-        grille : Grille
-            Objet Grille contenant la configuration initiale du sudoku
+        tuple(int, int, int, int)
+            Type (VALEUR ou ANNOTATION), case, ancienne valeur (0 pour une annotation),
+            nouvelle valeur ou chiffre annoté
 
         """
-        grille = Grille(9)
-        self._remplir_grille_aleatoire(grille)
-        solution = cp.deepcopy(grille.grille)
-        self._retirer_cases(grille)
-        grille.solution = solution
-        return grille
-        #Génère la grille pleine
+        return (enregistrement >> 30) & 1, (enregistrement >> 20) & 0x3FF, (enregistrement >> 5) & 0x1F, enregistrement & 0x1F
     
-    def _remplir_grille_aleatoire(self, grille):
+    def ajouter(self, enregistrements):
         """
-        Remplit récursivement la grille de sudoku entière et en "bloque" toutes les cases
+        Ajoute un coup après le coup courant. Les coups annulés qui suivaient ne peuvent plus être refaits
 
         Parameters
         ----------
-        grille : Grille
-            Grille à remplir
+        enregistrements : list[int]
+            Enregistrements du coup (le premier porte le coup, les suivants en sont la suite)
 
         """
-        chiffres = [1,2,3,4,5,6,7,8,9]
-        
-        def remplir_cases():
-            vide = grille.case_vide()
-            if not vide:
-                return True
-            ligne, colonne = vide
-            rd.shuffle(chiffres)
-            for chiffre in chiffres:
-                if grille.est_correct(ligne, colonne, chiffre):
-                    grille.grille[ligne, colonne] = chiffre
-                    if remplir_cases():
-                        return True
-                    grille.grille[ligne, colonne] = 0
-            return False
-        
-        remplir_cases()
-        
-        grille.bloquee[:, :] = True
+        if self.coup < len(self.debuts):
+            del self.enregistrements[self.debuts[self.coup]:]
+            del self.debuts[self.coup:]
+        self.debuts.append(len(self.enregistrements))
+        self.enregistrements.append(enregistrements[0])
+        self.enregistrements.extend(enregistrement | self._SUITE for enregistrement in enregistrements[1:])
+        self.coup += 1
+    
+    def _tranche(self, coup):
+        #Enregistrements d'un coup, sans le bit "suite"
+        fin = self.debuts[coup + 1] if coup + 1 < len(self.debuts) else len(self.enregistrements)
+        return [enregistrement & ~self._SUITE for enregistrement in self.enregistrements[self.debuts[coup]:fin]]
     
-    def _retirer_cases(self, grille, nb_tentative = 1000):
+    def annuler(self):
         """
-          Retire des cases d'une grille au hasard en s'assurant qu'il existe une solution unique
+        Recule d'un coup
 
-        Parameters
-        ----------
-        grille : Grille
-            Grille complète à vider
-        nb_tentative : int, optional
-            Nombre de tentative à réaliser (pour garantir l'uncicité) avant d'abandonner. La valeur par défaut est 1000
+        Returns
+        -------
+        list[int] ou None
+            Enregistrements du coup à défaire (à appliquer à l'envers), None s'il n'y a rien à annuler
 
         """
-        cases_a_retirer = self.difficulte
-        tentative = 0
-        while cases_a_retirer > 0 and tentative < nb_tentative:
-            ligne = rd.randint(0,8)
-            colonne = rd.randint(0,8)
-            if grille.grille[ligne, colonne] == 0:
-                continue
-            valeur_sauv = grille.grille[ligne, colonne]
-            grille.grille[ligne, colonne] = 0
-            grille.bloquee[ligne, colonne] = False
-            
-            copie = Grille(9)
-            copie.en_matrice(cp.deepcopy(grille.grille))
-            resolveur = ResolveurSudoku(copie)
-            nb_solutions = self._compter_solutions(resolveur, limite=2)
-            
-            if nb_solutions != 1:
-                grille.grille[ligne, colonne] = valeur_sauv
-                grille.bloquee[ligne, colonne] = True
-            else:
-                cases_a_retirer -= 1
-            tentative += 1
+        if self.coup == 0:
+            return None
+        self.coup -= 1
+        return self._tranche(self.coup)
     
-    def _compter_solutions(self, resolveur, limite=2):
+    def refaire(self):
         """
-        Compte le nombre de solutions possibles pour une grille donnée
-
-        Parameters
-        ----------
-        resolveur : ResolveurSudoku
-            Objet servant à résoudre la grille
-        limite : int, optional
-            Nombre maximal de solutions à chercher avant d'arrêter. La valeur par défaut est 2
+        Avance d'un coup
 
         Returns
         -------
-        int
-            Nombre de solutions trouvées
+        list[int] ou None
+            Enregistrements du coup à rejouer, None s'il n'y a rien à refaire
 
         """
-        solutions = [0]
-        
-        def backtrack():
-            if solutions[0] >= limite:
-                return
-            vide = resolveur.grille.case_vide()
-            if not vide:
-                solutions[0]+=1
-                return
-            ligne, colonne = vide
-            for chiffre in range(1, 10):
-                if resolveur.grille.est_correct(ligne, colonne, chiffre):
-                    resolveur.grille.grille[ligne, colonne] = chiffre
-                    backtrack()
-                    resolveur.grille.grille[ligne, colonne] = 0
-        
-        backtrack()
-        return solutions[0]
-
-
-
-class ResolveurSudoku():
-    """
-    Résout une grille de sudoku donnée à l'aide d'un algorithme récursif
-    
-    Attributs
-    ---------
-    grille : Grille
-        Grille de sudoku à résoudre
+        if self.coup == len(self.debuts):
+            return None
+        self.coup += 1
+        return self._tranche(self.coup - 1)
     
-    """
-    def __init__(self, grille):
+    def en_octets(self):
         """
-        Initialise le résolveur
+        Sérialise le journal : en-tête de 16 octets (signature b"SDKJ", version, coup courant,
+        nombre d'enregistrements) suivi des enregistrements (uint32 petit-boutiste)
 
-        Parameters
-        ----------
-        grille : grille
-            Grille à résoudre
+        Returns
+        -------
+        bytes
+            Journal sérialisé
 
         """
-        self.grille = grille
+        enregistrements = self.enregistrements
+        if sys.byteorder != "little":
+            enregistrements = array("I", enregistrements)
+            enregistrements.byteswap()
+        return self._ENTETE.pack(self.SIGNATURE, self.VERSION, self.coup, len(enregistrements)) + enregistrements.tobytes()
     
-    def resoudre(self):
+    @classmethod
+    def depuis_octets(cls, octets):
         """
-        Résout la grille de sudoku
+        Relit un journal sérialisé par en_octets
+
+        Parameters
+        ----------
+        octets : bytes
+            Journal sérialisé
 
         Returns
         -------
-        bool
-            True si la grille a été résolue, False sinon
+        JournalCoups
+            Journal relu
 
-        """
-        vide = self.grille.case_vide()
-        if not vide:
-            return True
-        ligne, colonne = vide
-        
-        for chiffre in range(1, 10):
-            if self.grille.est_correct(ligne, colonne, chiffre):
-                self.grille.grille[ligne, colonne] = chiffre
-                if self.resoudre():
-                    return True
-                self.grille.grille[ligne, colonne] = 0
-        return False
+        Raises
+        ------
+        ValueError
+            Si les octets ne sont pas un journal valide
 
+        """
+        if len(octets) < cls._ENTETE.size:
+            raise ValueError("Journal tronqué")
+        signature, version, coup, nombre = cls._ENTETE.unpack_from(octets)
+        if signature != cls.SIGNATURE or version != cls.VERSION:
+            raise ValueError(f"Journal de coups invalide (version {cls.VERSION} attendue)")
+        journal = cls()
+        journal.enregistrements.frombytes(octets[cls._ENTETE.size:cls._ENTETE.size + 4 * nombre])
+        if len(journal.enregistrements) != nombre:
+            raise ValueError("Journal tronqué")
+        if sys.byteorder != "little":
+            journal.enregistrements.byteswap()
+        #Les débuts de coups se retrouvent grâce au bit "suite"
+        suites = np.frombuffer(journal.enregistrements, dtype=np.uint32) >> 31
+        journal.debuts = array("I", np.flatnonzero(suites == 0).astype(np.uint32).tobytes())
+        if coup > len(journal.debuts):
+            raise ValueError("Journal de coups invalide (coup courant hors du journal)")
+        journal.coup = coup
+        return journal
 
 
 class Jeu():
@@ -378,10 +2380,34 @@ class Jeu():
     ---------
     grille : Grille
         Grille de sudoku active
-    anotations : list[list[set(int)]]
-        Tableau contenant les annotations du joueur pour chaque case
+    annotations : np.ndarray
+        Annotations du joueur, un masque de bits par case (le bit i est à 1 si le chiffre i est noté)
+    candidats_auto : bool
+        True si les candidats de chaque case sont tenus à jour (et affichés à la place des annotations)
+    candidats : np.ndarray ou None
+        Masque des chiffres possibles de chaque case vide (0 pour une case remplie),
+        mis à jour à chaque coup en mode candidats automatiques, None sinon
+    verbeux : bool
+        Si True, les messages sont affichés dans la console. Sinon ils sont seulement gardés dans message
+    message : str ou None
+        Dernier message du jeu (coup joué, coup refusé, ...)
+    journal : JournalCoups
+        Coups joués (placements, effacements et annotations), pour les annuler et les refaire
+    
+    Une partie se sauvegarde en binaire (en_octets, sauvegarder) : en-tête de 12 octets
+    (signature b"SDKP", version, taille, drapeaux, longueur du journal) puis annotations (uint32),
+    candidats (uint32, en mode candidats automatiques), valeurs (un octet par case),
+    solution (si elle est connue), masque des cases bloquées et journal.
+    Au chargement, les tableaux NumPy pointent directement dans le tampon lu, sans copie.
     
     """
+    SIGNATURE = b"SDKP"
+    VERSION = 1
+    _ENTETE = struct.Struct("<4sHBBI")
+    #Drapeaux de l'en-tête
+    _AVEC_SOLUTION = 1
+    _VERIF_SOLUTION = 2
+    _CANDIDATS_AUTO = 4
     
     #       Version qui résoud automatiquement la grille
     # def __init__(self, grille_initiale):
@@ -401,16 +2427,26 @@ class Jeu():
     # def montrer(self):
     #     print(self.grille)
 
-    def __init__(self, grille_initiale, solution = None, verif_solution = False):
+    def __init__(self, grille_initiale, solution = None, verif_solution = False, candidats_auto = False, verbeux = True):
         """
         Initialise le jeu avec une grille
 
         Parameters
         ----------
         grille_initiale : list[list[int]]
-            Grille de départ du sudoku
+            Grille de départ du sudoku (sa taille fixe celle du jeu, 9 si elle est absente)
+        solution : array-like, optional
+            Solution de la grille, pour la vérification des coups
+        verif_solution : bool, optional
+            Si True, un coup différent de la solution est refusé. La valeur par défaut est False
+        candidats_auto : bool, optional
+            Si True, les candidats de chaque case sont tenus à jour. La valeur par défaut est False
+        verbeux : bool, optional
+            Si False, rien n'est affiché (mode sans console). La valeur par défaut est True
 
         """
+        self.verbeux = verbeux
+        self.message = None
         self.grille = Grille(9)
         if grille_initiale is not None:
             self.grille.en_matrice(grille_initiale)
@@ -419,29 +2455,259 @@ class Jeu():
         else:
             self.solution = None
         self.verif_solution = verif_solution
-        self.annotations = [[set() for i in range(9)] for j in range(9)]
+        taille = self.grille.taille
+        #uint32 : jusqu'au chiffre 25 (bit 0 inutilisé)
+        self.annotations = np.zeros((taille, taille), dtype=np.uint32)
+        self.candidats_auto = False
+        self.candidats = None
+        self.journal = JournalCoups()
+        if candidats_auto:
+            self.basculer_candidats_auto()
+    
+    def basculer_candidats_auto(self):
+        """
+        Active ou désactive le mode candidats automatiques. À l'activation, les candidats
+        de toutes les cases sont calculés d'un coup ; ils sont ensuite mis à jour à chaque coup
+
+        Returns
+        -------
+        bool
+            True si le mode est maintenant actif
+
+        """
+        self.candidats_auto = not self.candidats_auto
+        if not self.candidats_auto:
+            self.candidats = None
+            return False
+        taille = self.grille.taille
+        n = self.grille.taille_carre
+        valeurs = self.grille.grille.astype(np.uint32)
+        bits = np.where(valeurs != 0, np.left_shift(np.uint32(1), valeurs), np.uint32(0))
+        lignes = np.bitwise_or.reduce(bits, axis=1)
+        colonnes = np.bitwise_or.reduce(bits, axis=0)
+        carres = np.bitwise_or.reduce(bits.reshape(n, n, n, n), axis=(1, 3))
+        presents = lignes[:, None] | colonnes[None, :] | np.repeat(np.repeat(carres, n, axis=0), n, axis=1)
+        plein = np.uint32((1 << (taille + 1)) - 2)
+        self.candidats = np.where(valeurs == 0, plein & ~presents, np.uint32(0)).astype(np.uint32)
+        return True
+    
+    def _effacer_chiffre(self, masques, ligne, colonne, valeur):
+        """
+        Retire un chiffre des masques de la ligne, de la colonne et du carré d'une case
+
+        """
+        garder = np.uint32(~(1 << valeur) & 0xFFFFFFFF)
+        n = self.grille.taille_carre
+        l, c = n * (ligne // n), n * (colonne // n)
+        masques[ligne, :] &= garder
+        masques[:, colonne] &= garder
+        masques[l:l+n, c:c+n] &= garder
+    
+    def _recalculer_candidats(self, ligne, colonne):
+        """
+        Recalcule les candidats des cases vides de la ligne, de la colonne et du carré d'une case
+        qui vient d'être vidée (les seules dont les candidats peuvent changer)
+
+        """
+        grille = self.grille
+        taille = grille.taille
+        n = grille.taille_carre
+        l, c = n * (ligne // n), n * (colonne // n)
+        cases = ([(ligne, j) for j in range(taille)] + [(i, colonne) for i in range(taille)]
+                 + [(l + i // n, c + i % n) for i in range(taille)])
+        for i, j in cases:
+            if grille.grille[i, j] == 0:
+                self.candidats[i, j] = grille.masque_candidats(i, j)
             
+    def signaler(self, message):
+        """
+        Garde le message dans self.message et l'affiche si le jeu est verbeux
+
+        Parameters
+        ----------
+        message : str
+            Message pour le joueur
+
+        """
+        self.message = message
+        if self.verbeux:
+            print(message)
+    
+    def en_octets(self):
+        """
+        Sauvegarde la partie entière (grille, cases bloquées, solution, annotations, candidats et journal)
+
+        Returns
+        -------
+        bytes
+            Partie sérialisée
+
+        """
+        grille = self.grille
+        nb_cases = grille.taille * grille.taille
+        drapeaux = ((self._AVEC_SOLUTION if self.solution is not None else 0)
+                    | (self._VERIF_SOLUTION if self.verif_solution else 0)
+                    | (self._CANDIDATS_AUTO if self.candidats_auto else 0))
+        journal = self.journal.en_octets()
+        morceaux = [self._ENTETE.pack(self.SIGNATURE, self.VERSION, grille.taille, drapeaux, len(journal)),
+                    self.annotations.astype("<u4", copy=False).tobytes()]
+        if self.candidats_auto:
+            morceaux.append(self.candidats.astype("<u4", copy=False).tobytes())
+        morceaux.append(grille.grille.tobytes())
+        if self.solution is not None:
+            morceaux.append(np.asarray(self.solution, dtype=np.uint8).tobytes())
+        morceaux.append(grille._bloquees.to_bytes((nb_cases + 7) // 8, "little"))
+        morceaux.append(journal)
+        return b"".join(morceaux)
+    
+    @classmethod
+    def depuis_octets(cls, octets, verbeux=False):
+        """
+        Reprend une partie sauvegardée par en_octets. La grille, la solution, les annotations et
+        les candidats sont des vues sur le tampon : avec un bytearray (ou tout tampon modifiable),
+        rien n'est copié
+
+        Parameters
+        ----------
+        octets : bytes, bytearray ou memoryview
+            Partie sérialisée. Un tampon en lecture seule (bytes) est d'abord copié une fois
+        verbeux : bool, optional
+            Si True, la partie reprise s'affiche dans la console. La valeur par défaut est False
+
+        Returns
+        -------
+        Jeu
+            Partie reprise dans l'état de la sauvegarde
+
+        Raises
+        ------
+        ValueError
+            Si les octets ne sont pas une partie valide (y compris une valeur ou un coup du journal hors de la grille,
+            ou une case donnée différente de la solution)
+
+        """
+        tampon = memoryview(octets)
+        if tampon.readonly:
+            tampon = memoryview(bytearray(tampon))
+        if len(tampon) < cls._ENTETE.size:
+            raise ValueError("Partie tronquée")
+        signature, version, taille, drapeaux, longueur_journal = cls._ENTETE.unpack_from(tampon)
+        if signature != cls.SIGNATURE or version != cls.VERSION:
+            raise ValueError(f"Partie sauvegardée invalide (version {cls.VERSION} attendue)")
+        nb_cases = taille * taille
+        nb_octets_bloquees = (nb_cases + 7) // 8
+        avec_solution = bool(drapeaux & cls._AVEC_SOLUTION)
+        candidats_auto = bool(drapeaux & cls._CANDIDATS_AUTO)
+        attendu = (cls._ENTETE.size + 4 * nb_cases * (2 if candidats_auto else 1) + nb_cases * (2 if avec_solution else 1)
+                   + nb_octets_bloquees + longueur_journal)
+        if len(tampon) < attendu:
+            raise ValueError("Partie tronquée")
+        
+        #Instance construite sans passer par __init__ : tous les attributs sont relus
+        jeu = cls.__new__(cls)
+        position = cls._ENTETE.size
+        jeu.annotations = np.frombuffer(tampon, dtype="<u4", count=nb_cases, offset=position).reshape(taille, taille)
+        position += 4 * nb_cases
+        jeu.candidats_auto = candidats_auto
+        jeu.candidats = None
+        if candidats_auto:
+            jeu.candidats = np.frombuffer(tampon, dtype="<u4", count=nb_cases, offset=position).reshape(taille, taille)
+            position += 4 * nb_cases
+        jeu.grille = Grille(taille)
+        jeu.grille.grille = np.frombuffer(tampon, dtype=np.uint8, count=nb_cases, offset=position).reshape(taille, taille)
+        position += nb_cases
+        jeu.solution = None
+        if avec_solution:
+            jeu.solution = np.frombuffer(tampon, dtype=np.uint8, count=nb_cases, offset=position).reshape(taille, taille)
+            position += nb_cases
+        jeu.grille._bloquees = int.from_bytes(tampon[position:position + nb_octets_bloquees], "little")
+        bloquees = np.unpackbits(np.frombuffer(tampon, dtype=np.uint8, count=nb_octets_bloquees, offset=position),
+                                 count=nb_cases, bitorder="little").view(bool).reshape(taille, taille)
+        position += nb_octets_bloquees
+        #Une valeur hors de la grille ne doit pas attendre l'affichage pour échouer
+        if jeu.grille.grille.max(initial=0) > taille:
+            raise ValueError("Partie sauvegardée invalide (valeur hors de la grille)")
+        if avec_solution:
+            if jeu.solution.min(initial=1) < 1 or jeu.solution.max(initial=0) > taille:
+                raise ValueError("Partie sauvegardée invalide (solution incomplète ou hors de la grille)")
+            donnees = bloquees & (jeu.grille.grille != 0)
+            if (jeu.grille.grille[donnees] != jeu.solution[donnees]).any():
+                raise ValueError("Partie sauvegardée invalide (case donnée différente de la solution)")
+        jeu.journal = JournalCoups.depuis_octets(tampon[position:position + longueur_journal])
+        #Un journal corrompu doit échouer ici, pas plus tard dans annuler ou refaire
+        enregistrements = np.frombuffer(jeu.journal.enregistrements, dtype=np.uint32)
+        cases = (enregistrements >> 20) & 0x3FF
+        anciennes = (enregistrements >> 5) & 0x1F
+        nouvelles = enregistrements & 0x1F
+        annotations = ((enregistrements >> 30) & 1) == JournalCoups.ANNOTATION
+        if ((cases >= nb_cases).any() or (anciennes > taille).any() or (nouvelles > taille).any()
+                or (annotations & ((nouvelles == 0) | (anciennes != 0))).any()):
+            raise ValueError("Journal de coups invalide (coup hors de la grille)")
+        jeu.verif_solution = bool(drapeaux & cls._VERIF_SOLUTION)
+        jeu.verbeux = verbeux
+        jeu.message = None
+        return jeu
+    
+    def sauvegarder(self, chemin):
+        """
+        Écrit la partie dans un fichier (voir en_octets)
+
+        Parameters
+        ----------
+        chemin : str
+            Fichier de sauvegarde
+
+        """
+        with open(chemin, "wb") as fichier:
+            fichier.write(self.en_octets())
+    
+    @classmethod
+    def charger(cls, chemin, verbeux=False):
+        """
+        Reprend une partie écrite par sauvegarder
+
+        Parameters
+        ----------
+        chemin : str
+            Fichier de sauvegarde
+        verbeux : bool, optional
+            Si True, la partie reprise s'affiche dans la console. La valeur par défaut est False
+
+        Returns
+        -------
+        Jeu
+            Partie reprise
+
+        """
+        with open(chemin, "rb") as fichier:
+            tampon = bytearray(os.fstat(fichier.fileno()).st_size)
+            fichier.readinto(tampon)
+        return cls.depuis_octets(tampon, verbeux)
+    
     def montrer(self):
         """
         Affiche la grille actuelle et les annotations dans la console
 
         """
+        taille = self.grille.taille
+        n = self.grille.taille_carre
+        notes = self.candidats if self.candidats_auto else self.annotations
         print()
-        for i in range(9):
-            if i % 3 == 0 and i != 0:
-                print("-" * 43)
+        for i in range(taille):
+            if i % n == 0 and i != 0:
+                print("-" * (4 * taille + 3 * n - 2))
             ligne_aff = []
-            for j in range(9):
+            for j in range(taille):
                 val = int(self.grille.grille[i,j])
                 if val != 0:
-                    affichage = " " + str(val) + " "
-                elif self.annotations[i][j]:
-                    notes = "".join(str(x) for x in sorted(self.annotations[i][j]))
-                    affichage = "{" + notes + "}"
+                    affichage = " " + SYMBOLES[val] + " "
+                elif notes[i, j]:
+                    masque = int(notes[i, j])
+                    affichage = "{" + "".join(SYMBOLES[x] for x in range(1, taille + 1) if (masque >> x) & 1) + "}"
                 else:
                     affichage = " . "
                 ligne_aff.append(affichage)
-                if (j+1) % 3 == 0 and j != 8:
+                if (j+1) % n == 0 and j != taille - 1:
                     ligne_aff.append(" | ")
             print(" ".join(ligne_aff))
         print()
@@ -465,32 +2731,37 @@ class Jeu():
             True si le coup est valide et joué, False sinon
 
         """
-        if self.grille.bloquee[ligne, colonne]:
-            print("\nLa case est fixée")
+        if self.grille.est_bloquee(ligne, colonne):
+            self.signaler("\nLa case est fixée")
             return False
         if valeur == 0:
-            print(f"\nEffacement ({ligne+1}, {colonne+1})")
+            self.signaler(f"\nEffacement ({ligne+1}, {colonne+1})")
             return self.retirer_coup(ligne, colonne)
         if not self.grille.est_correct(ligne, colonne, valeur):
-            print(f"\n{valeur} ne peut pas être placée en ({ligne+1},{colonne+1})")
+            self.signaler(f"\n{valeur} ne peut pas être placée en ({ligne+1},{colonne+1})")
             return False
         
         #Vérification optionnelle avec la solution
         if self.verif_solution and self.solution is not None :
             if valeur != self.solution[ligne, colonne]:
-                print(f"\nErreur : {valeur} n'est pas la bonne valeur à ({ligne+1},{colonne+1})")
+                self.signaler(f"\nErreur : {valeur} n'est pas la bonne valeur à ({ligne+1},{colonne+1})")
                 return False
         
-        self.grille.completer_case(ligne, colonne, valeur)
-        carre_ligne = ligne // 3
-        carre_colonne = colonne // 3
-        for i in range(3):
-            for j in range(3):
-                ind_i = carre_ligne * 3 + i
-                ind_j = carre_colonne * 3 + j
-                if valeur in self.annotations[ind_i][ind_j]:
-                    self.annotations[ind_i][ind_j].remove(valeur)
-        print(f"\n{valeur} placé en ({ligne+1}, {colonne+1})")
+        taille = self.grille.taille
+        case = ligne * taille + colonne
+        enregistrements = [JournalCoups.valeur(case, int(self.grille.grille[ligne, colonne]), valeur)]
+        #La valeur n'est plus une annotation possible dans sa ligne, sa colonne et son carré :
+        #les annotations effacées sont journalisées avec le coup
+        bit = np.uint32(1 << valeur)
+        annotations = self.annotations.reshape(-1)
+        voisinage = _voisinage(taille)[case]
+        effacees = voisinage[(annotations[voisinage] & bit) != 0]
+        if len(effacees):
+            annotations[effacees] &= ~bit
+            enregistrements.extend(JournalCoups.annotation(autre, valeur) for autre in effacees.tolist())
+        self._changer_valeur(ligne, colonne, valeur)
+        self.journal.ajouter(enregistrements)
+        self.signaler(f"\n{valeur} placé en ({ligne+1}, {colonne+1})")
         return True
     
     def retirer_coup(self, ligne, colonne):
@@ -511,7 +2782,98 @@ class Jeu():
         
         
         """
-        return self.grille.vider_case(ligne, colonne)
+        if self.grille.est_bloquee(ligne, colonne):
+            return False
+        ancienne = int(self.grille.grille[ligne, colonne])
+        if ancienne != 0:
+            self.journal.ajouter([JournalCoups.valeur(ligne * self.grille.taille + colonne, ancienne, 0)])
+            self._changer_valeur(ligne, colonne, 0)
+        return True
+    
+    def _changer_valeur(self, ligne, colonne, valeur):
+        """
+        Écrit une valeur dans une case (0 pour la vider), sans aucune vérification,
+        et met à jour les candidats automatiques
+
+        """
+        ancienne = int(self.grille.grille[ligne, colonne])
+        self.grille._effacer(ligne, colonne)
+        if valeur != 0:
+            self.grille._poser(ligne, colonne, valeur)
+        if self.candidats_auto:
+            if ancienne != 0:
+                self._recalculer_candidats(ligne, colonne)
+            if valeur != 0:
+                self._effacer_chiffre(self.candidats, ligne, colonne, valeur)
+                self.candidats[ligne, colonne] = 0
+    
+    def _appliquer(self, enregistrements, en_arriere=False):
+        """
+        Applique (ou défait, en parcourant à l'envers) les enregistrements d'un coup
+
+        """
+        taille = self.grille.taille
+        for enregistrement in (reversed(enregistrements) if en_arriere else enregistrements):
+            genre, case, ancienne, nouvelle = JournalCoups.decoder(enregistrement)
+            ligne, colonne = divmod(case, taille)
+            if genre == JournalCoups.ANNOTATION:
+                self.annotations[ligne, colonne] ^= np.uint32(1 << nouvelle)
+            else:
+                self._changer_valeur(ligne, colonne, ancienne if en_arriere else nouvelle)
+    
+    def annuler(self):
+        """
+        Annule le dernier coup (placement, effacement ou annotation)
+
+        Returns
+        -------
+        bool
+            True si un coup a été annulé, False s'il n'y en avait aucun
+
+        """
+        enregistrements = self.journal.annuler()
+        if enregistrements is None:
+            return False
+        self._appliquer(enregistrements, en_arriere=True)
+        return True
+    
+    def refaire(self):
+        """
+        Refait le dernier coup annulé
+
+        Returns
+        -------
+        bool
+            True si un coup a été refait, False s'il n'y en avait aucun
+
+        """
+        enregistrements = self.journal.refaire()
+        if enregistrements is None:
+            return False
+        self._appliquer(enregistrements)
+        return True
+    
+    def aller_au_coup(self, numero):
+        """
+        Remet la partie dans l'état qui suivait un coup donné, en annulant ou refaisant les coups un à un
+
+        Parameters
+        ----------
+        numero : int
+            Nombre de coups appliqués voulu (0 pour revenir à la grille de départ)
+
+        Raises
+        ------
+        ValueError
+            Si le numéro est en dehors du journal
+
+        """
+        if not 0 <= numero <= len(self.journal):
+            raise ValueError(f"Coup {numero} hors du journal (0-{len(self.journal)})")
+        while self.journal.coup > numero:
+            self.annuler()
+        while self.journal.coup < numero:
+            self.refaire()
     
     def est_complete(self):
         """
@@ -525,6 +2887,28 @@ class Jeu():
         """
         return self.grille.est_complete()
     
+    def indice(self, limite=None):
+        """
+        Cherche la prochaine case que le joueur peut remplir par déduction, avec les techniques
+        humaines les plus simples possibles, sans résoudre toute la grille.
+        Les éliminations (pointage, paires, ...) sont enchaînées jusqu'à ce qu'un placement apparaisse
+
+        Parameters
+        ----------
+        limite : int, optional
+            Niveau maximal des techniques essayées (voir techniques.TECHNIQUES). Par défaut, toutes
+
+        Returns
+        -------
+        dict ou None
+            "ligne", "colonne" (indices à partir de 0), "chiffre", "technique" (la plus difficile
+            nécessaire) et "etapes" (techniques appliquées, dans l'ordre), ou None si aucune
+            technique ne permet de progresser
+
+        """
+        #Les candidats tenus à jour en mode automatique évitent de les recalculer
+        return chercher_indice(self.grille.grille, self.candidats if self.candidats_auto else None, limite)
+    
     def annoter_case(self, ligne, colonne, chiffre):
         """
         Ajoute ou retire une annotation dans une case
@@ -544,21 +2928,20 @@ class Jeu():
             True si l'annotation a été modifiée, False sinon
 
         """
-        if self.grille.bloquee[ligne, colonne]:
-            print("\nImpossible d'annoter une case fixée")
+        if self.grille.est_bloquee(ligne, colonne):
+            self.signaler("\nImpossible d'annoter une case fixée")
             return False
-        if not (1 <= chiffre <= 9):
-            print("\nLes annotations doivent être comprises entre 1 et 9")
+        if not (1 <= chiffre <= self.grille.taille):
+            self.signaler(f"\nLes annotations doivent être comprises entre 1 et {self.grille.taille}")
             return False
         # if not (0<= ligne <= 8) and (0<= colonne <= 8):
         #     print("")
-        notes = self.annotations[ligne][colonne]
-        if chiffre in notes:
-            notes.remove(chiffre)
-            print(f"\nAnnotation {chiffre} retirée de ({ligne+1}, {colonne+1})")
+        self.annotations[ligne, colonne] ^= np.uint32(1 << chiffre)
+        self.journal.ajouter([JournalCoups.annotation(ligne * self.grille.taille + colonne, chiffre)])
+        if not (int(self.annotations[ligne, colonne]) >> chiffre) & 1:
+            self.signaler(f"\nAnnotation {chiffre} retirée de ({ligne+1}, {colonne+1})")
         else:
-            notes.add(chiffre)
-            print(f"\nAnnotation {chiffre} ajoutée en ({ligne+1}, {colonne+1})")
+            self.signaler(f"\nAnnotation {chiffre} ajoutée en ({ligne+1}, {colonne+1})")
         return True
 
 #####   Fonctions utilitaires #####
@@ -568,52 +2951,430 @@ def mode_verif(jeu):
         etat = "activée" 
     else:
         etat = "désactivée"
-        print(f"\nVérification par rapport à la solution {etat}")
+    jeu.signaler(f"\nVérification par rapport à la solution {etat}")
 
-def traiter_entree(entree, jeu):
+def mode_candidats(jeu):
+    if jeu.basculer_candidats_auto():
+        jeu.signaler("\nCandidats automatiques activés")
+    else:
+        jeu.signaler("\nCandidats automatiques désactivés")
+
+def chercher_indice(valeurs, candidats=None, limite=None):
+    """
+    Cherche la prochaine case qui peut être remplie par déduction (voir Jeu.indice). Fonction de module,
+    pour pouvoir être exécutée dans un processus de travail (voir serveur.py)
+
+    Parameters
+    ----------
+    valeurs : np.ndarray
+        Grille (taille, taille), 0 pour les cases vides
+    candidats : np.ndarray, optional
+        Masques des candidats de chaque case. Par défaut, ils sont calculés à partir des valeurs
+    limite : int, optional
+        Niveau maximal des techniques essayées. Par défaut, toutes
+
+    Returns
+    -------
+    dict ou None
+        Indice (voir Jeu.indice), None si aucune technique ne permet de progresser
+
+    """
+    taille = len(valeurs)
+    evaluateur = tq.EvaluateurTechniques(valeurs, candidats)
+    etapes = []
+    while True:
+        etape = evaluateur.prochaine_etape(limite)
+        if etape is None:
+            return None
+        technique, placements, eliminations = etape
+        etapes.append(technique)
+        if placements:
+            case, chiffre = placements[0]
+            return {"ligne": case // taille, "colonne": case % taille, "chiffre": chiffre,
+                    "technique": max(etapes, key=tq.NIVEAUX.get), "etapes": etapes}
+        evaluateur.appliquer(etape)
+
+#Valeur par défaut de executer_commande(conseil=...) : l'indice n'est pas encore calculé
+_A_CALCULER = object()
+
+def executer_commande(entree, jeu, conseil=_A_CALCULER):
+    """
+    Applique une commande de la console à une partie (voir main pour la liste des commandes)
+
+    Parameters
+    ----------
+    entree : str
+        Commande, par exemple "3 3 5", "a 1 2 4", "annuler", "indice", "q"
+    jeu : Jeu
+        Partie à laquelle s'applique la commande (avec verbeux=False, rien n'est affiché)
+    conseil : dict ou None, optional
+        Pour la commande "indice" : indice déjà calculé par chercher_indice (par exemple dans un
+        processus de travail). Par défaut, il est calculé ici par jeu.indice()
+
+    Returns
+    -------
+    dict
+        "commande" (jouer, annoter, mode, auto, annuler, refaire, indice, quitter ou invalide),
+        "ok" (commande acceptée et appliquée), "message" (message pour le joueur, ou None),
+        "continuer" (False après "q"), "complete" (grille remplie), et selon la commande
+        "ligne", "colonne", "valeur" (indices à partir de 0) ou "indice" (voir Jeu.indice)
+
+    """
     entree = entree.strip().lower()
+    jeu.message = None
+    resultat = {"commande": "invalide", "ok": False, "continuer": True}
     
     if entree in ("q", "quit", "exit"):
-        print("\nVous avez quitté le jeu :(")
-        return False
+        jeu.signaler("\nVous avez quitté le jeu :(")
+        resultat.update(commande="quitter", ok=True, continuer=False)
     
     elif entree.startswith("mode"):
         mode_verif(jeu)
-        return True
+        resultat.update(commande="mode", ok=True)
     
-    try:
-        parties = entree.split()
-        if parties[0] == "a" and len(parties) == 4:
-            x, l, c, v = parties
-            ligne, colonne, valeur = int(l)-1, int(c)-1, int(v)
-            if not (0 <= ligne <= 8 and 0 <= colonne <= 8 and 0 <= valeur <= 9):
-                print("Vous avez dépassé les bornes ! 1-9 pour les cases, 1-9 pour les valeurs et 0 pour effacer")
-                    
-            jeu.annoter_case(ligne, colonne, valeur)
+    elif entree == "auto":
+        mode_candidats(jeu)
+        resultat.update(commande="auto", ok=True)
+    
+    elif entree in ("annuler", "refaire"):
+        resultat.update(commande=entree, ok=getattr(jeu, entree)())
+        if not resultat["ok"]:
+            jeu.signaler(f"\nRien à {entree}")
+    
+    elif entree == "indice":
+        if conseil is _A_CALCULER:
+            conseil = jeu.indice()
+        resultat.update(commande="indice", ok=conseil is not None, indice=conseil)
+        if conseil is None:
+            jeu.signaler("\nAucune déduction simple : il faut faire un essai")
         else:
-            ligne, colonne, valeur = map(int, parties)
+            jeu.signaler(f"\n{conseil['chiffre']} en ({conseil['ligne']+1}, {conseil['colonne']+1}) par {conseil['technique']}")
+    
+    else:
+        taille = jeu.grille.taille
+        try:
+            parties = entree.split()
+            annotation = len(parties) == 4 and parties[0] == "a"
+            ligne, colonne, valeur = map(int, parties[1:] if annotation else parties)
             ligne -= 1
             colonne -= 1
-            if not (0 <= ligne <= 8 and 0 <= colonne <= 8 and 0 <= valeur <= 9):
-                print("Vous avez dépassé les bornes ! 1-9 pour les cases, 1-9 pour les valeurs et 0 pour effacer")
-                    
-            jeu.jouer_coup(ligne, colonne, valeur)
-                
-    except ValueError:
-        print("Format invalide : concentre toi")
-        
-    return True
+        except ValueError:
+            jeu.signaler("Format invalide : concentre toi")
+        else:
+            resultat.update(commande="annoter" if annotation else "jouer", ligne=ligne, colonne=colonne, valeur=valeur)
+            if not (0 <= ligne < taille and 0 <= colonne < taille and 0 <= valeur <= taille):
+                jeu.signaler(f"Vous avez dépassé les bornes ! 1-{taille} pour les cases, 1-{taille} pour les valeurs et 0 pour effacer")
+            elif annotation:
+                resultat["ok"] = jeu.annoter_case(ligne, colonne, valeur)
+            else:
+                resultat["ok"] = jeu.jouer_coup(ligne, colonne, valeur)
+    
+    resultat["message"] = None if jeu.message is None else jeu.message.strip()
+    resultat["complete"] = jeu.est_complete()
+    return resultat
+
+def traiter_entree(entree, jeu):
+    return executer_commande(entree, jeu)["continuer"]
+
+def executer_flux(commandes, jeux):
+    """
+    Rejoue un flux de commandes sur une ou plusieurs parties, sans rien afficher
+
+    Parameters
+    ----------
+    commandes : iterable
+        Commandes (chaînes, par exemple les lignes d'un fichier ou de l'entrée standard).
+        Avec plusieurs parties, chaque commande est un couple (session, commande) ou une chaîne
+        "session commande" ; les lignes vides et celles qui commencent par "#" sont ignorées
+    jeux : Jeu ou dict
+        Partie unique, ou parties indexées par leur identifiant de session (les identifiants
+        lus dans une chaîne sont des str)
+
+    Yields
+    ------
+    dict
+        Résultat de chaque commande (voir executer_commande), avec la clé "session" pour plusieurs parties
+
+    Raises
+    ------
+    KeyError
+        Si une commande vise une session inconnue
+
+    """
+    plusieurs = isinstance(jeux, dict)
+    parties = list(jeux.values()) if plusieurs else [jeux]
+    verbeux = [jeu.verbeux for jeu in parties]
+    for jeu in parties:
+        jeu.verbeux = False
+    try:
+        for commande in commandes:
+            session = None
+            if isinstance(commande, str):
+                commande = commande.strip()
+                if not commande or commande.startswith("#"):
+                    continue
+                if plusieurs:
+                    session, _, commande = commande.partition(" ")
+            else:
+                session, commande = commande
+            resultat = executer_commande(commande, jeux[session] if plusieurs else jeux)
+            if plusieurs:
+                resultat["session"] = session
+            yield resultat
+    finally:
+        for jeu, etat in zip(parties, verbeux):
+            jeu.verbeux = etat
 
 def afficher_grille(jeu):
     print("\n")
     jeu.montrer()
     
-def main():
-    generateur = GenerateurSudoku()
-    grille_sudoku = generateur.generer_grille()
+def graine_puzzle(graine, indice):
+    """
+    Dérive la graine d'un puzzle d'un lot à partir de la graine du lot et de son indice.
+    Chaque puzzle a ainsi sa propre graine, indépendante du processus qui le génère
+
+    Parameters
+    ----------
+    graine : int
+        Graine du lot
+    indice : int
+        Indice du puzzle dans le lot
+
+    Returns
+    -------
+    int
+        Graine (64 bits) du puzzle
+
+    """
+    return int(np.random.SeedSequence(graine, spawn_key=(indice,)).generate_state(1, np.uint64)[0])
+
+def _generer_puzzle(difficulte, graine, indice, taille=9, cible=None, remplissage="recherche", duree_max=None):
+    #Fonction exécutée dans les processus du lot (doit être au niveau du module pour être sérialisée)
+    graine_locale = graine_puzzle(graine, indice)
+    grille = GenerateurSudoku(difficulte, graine=graine_locale, taille=taille, cible=cible,
+                              remplissage=remplissage).generer_grille(duree_max)
+    return indice, graine_locale, grille
+
+def generer_lot(nombre, difficulte=None, graine=0, processus=None, en_vol=None, taille=9, cible=None,
+                remplissage="recherche"):
+    """
+    Génère un lot de puzzles en parallèle sur un ensemble de processus.
+    Les puzzles sont rendus au fur et à mesure qu'ils sont terminés (ordre de complétion) et
+    le nombre de tâches en cours est borné, pour que la mémoire ne dépende pas de la taille du lot.
+    Le puzzle d'indice i ne dépend que de (graine, i) : deux exécutions donnent les mêmes puzzles.
+
+    Parameters
+    ----------
+    nombre : int
+        Nombre de puzzles à générer
+    difficulte : int, optional
+        Nombre de cases à retirer. Par défaut, celle du générateur (40 pour une grille 9x9)
+    graine : int, optional
+        Graine du lot. La valeur par défaut est 0
+    processus : int, optional
+        Nombre de processus (par défaut le nombre de cœurs). Avec 1, la génération se fait dans le processus courant
+    en_vol : int, optional
+        Nombre maximal de puzzles en cours de génération (par défaut 4 par processus)
+    taille : int, optional
+        Taille des grilles. La valeur par défaut est 9
+    cible : int ou str, optional
+        Difficulté visée en techniques humaines (voir GenerateurSudoku). Par défaut, aucune
+    remplissage : str, optional
+        Méthode de remplissage des grilles pleines (voir GenerateurSudoku.REMPLISSAGES). La valeur par défaut est "recherche"
+
+    Yields
+    ------
+    tuple(int, int, Grille)
+        Indice du puzzle dans le lot, graine du puzzle et grille générée
+
+    """
+    if processus is None:
+        processus = os.cpu_count() or 1
+    if processus == 1:
+        for indice in range(nombre):
+            yield _generer_puzzle(difficulte, graine, indice, taille, cible, remplissage)
+        return
+    with cf.ProcessPoolExecutor(max_workers=processus) as executeur:
+        if en_vol is None:
+            en_vol = 4 * processus
+        indices = iter(range(nombre))
+        en_cours = set()
+        for indice in indices:
+            en_cours.add(executeur.submit(_generer_puzzle, difficulte, graine, indice, taille, cible, remplissage))
+            if len(en_cours) >= en_vol:
+                break
+        while en_cours:
+            terminees, en_cours = cf.wait(en_cours, return_when=cf.FIRST_COMPLETED)
+            for tache in terminees:
+                yield tache.result()
+                indice = next(indices, None)
+                if indice is not None:
+                    en_cours.add(executeur.submit(_generer_puzzle, difficulte, graine, indice, taille, cible, remplissage))
+
+def main_lot(arguments=None):
+    """
+    Point d'entrée en ligne de commande pour la génération par lot :
+    python main_propre.py lot -n 10000 -d 50 -g 42 -o puzzles.txt
+    Chaque ligne de sortie contient le puzzle, sa solution, sa difficulté et sa graine
+    (puis son niveau de technique si une cible est donnée avec -c)
+
+    Parameters
+    ----------
+    arguments : list[str], optional
+        Arguments de la ligne de commande (par défaut ceux de sys.argv)
+
+    """
+    analyseur = argparse.ArgumentParser(prog="main_propre.py lot", description="Génère des puzzles par lot")
+    analyseur.add_argument("-n", "--nombre", type=int, default=100, help="nombre de puzzles")
+    analyseur.add_argument("-d", "--difficulte", type=int, default=None, help="nombre de cases retirées (40 en 9x9 par défaut)")
+    analyseur.add_argument("-t", "--taille", type=int, default=9, help="taille des grilles (9, 16, 25)")
+    analyseur.add_argument("-c", "--cible", default=None,
+                           help="difficulté visée : niveau, technique (x_wing, ...) ou catégorie (facile, moyen, difficile, expert, diabolique)")
+    analyseur.add_argument("--remplissage", default="recherche", choices=GenerateurSudoku.REMPLISSAGES,
+                           help="remplissage des grilles pleines (motif : plus rapide, mais grilles toutes équivalentes)")
+    analyseur.add_argument("-g", "--graine", type=int, default=0, help="graine du lot")
+    analyseur.add_argument("-p", "--processus", type=int, default=None, help="nombre de processus")
+    analyseur.add_argument("-o", "--sortie", default=None, help="fichier de sortie (sortie standard par défaut)")
+    analyseur.add_argument("--sans-doublons", action="store_true",
+                           help="écarter les puzzles équivalents (par symétrie) à un puzzle déjà écrit")
+    analyseur.add_argument("--index", default=None, help="index des puzzles déjà vus, conservé sur disque (avec --sans-doublons)")
+    options = analyseur.parse_args(arguments)
+    cible = int(options.cible) if options.cible is not None and options.cible.isdigit() else options.cible
+    
+    index = None
+    if options.sans_doublons:
+        from canonique import IndexCanonique, TAILLE_MAXIMALE
+        #Vérifié avant toute génération, plutôt qu'au premier puzzle du lot
+        if options.taille > TAILLE_MAXIMALE:
+            analyseur.error(f"--sans-doublons n'est disponible que jusqu'aux grilles {TAILLE_MAXIMALE}x{TAILLE_MAXIMALE}")
+        index = IndexCanonique(capacite=2 * options.nombre, chemin=options.index)
+    sortie = open(options.sortie, "w", encoding="utf-8") if options.sortie else sys.stdout
+    try:
+        for indice, graine, grille in generer_lot(options.nombre, options.difficulte, options.graine, options.processus,
+                                                  taille=options.taille, cible=cible, remplissage=options.remplissage):
+            if index is not None and not index.ajouter(grille):
+                continue
+            solution = "".join(SYMBOLES[valeur] for valeur in grille.solution.ravel())
+            niveau = "" if grille.niveau is None else f" {grille.niveau}"
+            sortie.write(f"{grille.en_chaine()} {solution} {int((grille.grille == 0).sum())} {graine}{niveau}\n")
+    finally:
+        if sortie is not sys.stdout:
+            sortie.close()
+        if index is not None:
+            index.fermer()
+
+def main_rejouer(arguments=None):
+    """
+    Point d'entrée en ligne de commande pour rejouer des commandes sans affichage :
+    python main_propre.py rejouer PUZZLE -i commandes.txt
+    Chaque commande donne une ligne JSON de résultat (voir executer_commande) sur la sortie standard
+
+    Parameters
+    ----------
+    arguments : list[str], optional
+        Arguments de la ligne de commande (par défaut ceux de sys.argv)
+
+    """
+    analyseur = argparse.ArgumentParser(prog="main_propre.py rejouer", description="Rejoue des commandes sans affichage")
+    analyseur.add_argument("puzzle", help="grille de départ sur une ligne (0 ou . pour les cases vides)")
+    analyseur.add_argument("-s", "--solution", default=None, help="solution sur une ligne, pour la vérification des coups")
+    analyseur.add_argument("-i", "--entree", default="-", help="fichier de commandes (entrée standard par défaut)")
+    analyseur.add_argument("--sessions", action="store_true",
+                           help="chaque ligne commence par un identifiant de session (une partie par session)")
+    options = analyseur.parse_args(arguments)
+    
+    depart = Grille.depuis_chaine(options.puzzle).en_liste()
+    solution = None if options.solution is None else Grille.depuis_chaine(options.solution).grille
+    
+    def nouvelle_partie():
+        return Jeu(depart, solution=solution, verif_solution=solution is not None, verbeux=False)
+    
+    entree = sys.stdin if options.entree == "-" else open(options.entree, encoding="utf-8")
+    try:
+        if options.sessions:
+            jeux = {}
+            def commandes():
+                #Une nouvelle partie pour chaque session rencontrée
+                for ligne in entree:
+                    session = ligne.strip().partition(" ")[0]
+                    if session and not session.startswith("#") and session not in jeux:
+                        jeux[session] = nouvelle_partie()
+                    yield ligne
+            resultats = executer_flux(commandes(), jeux)
+        else:
+            resultats = executer_flux(entree, nouvelle_partie())
+        for resultat in resultats:
+            sys.stdout.write(json.dumps(resultat, ensure_ascii=False) + "\n")
+    finally:
+        if entree is not sys.stdin:
+            entree.close()
+
+def main(stock=None, taille=None, cible=None, reserve=None):
+    """
+    Lance une partie dans la console
+
+    Parameters
+    ----------
+    stock : str, optional
+        Stock de puzzles pré-générés (voir stockage.py) dans lequel tirer la grille.
+        Par défaut, la grille est générée au lancement
+    taille : int, optional
+        Taille de la grille (9, 16, 25). Par défaut, 9 pour une grille générée et celle du stock sinon
+    cible : int ou str, optional
+        Difficulté visée pour la grille générée (voir GenerateurSudoku), un niveau pouvant être
+        donné en texte ("3"). Le stock ne garde pas le niveau des puzzles : pas de cible avec un stock.
+        Par défaut, aucune
+    reserve : str, optional
+        Fichier d'une réserve de puzzles (voir reserve.py) : la grille y est prise si la réserve
+        en contient une, et la réserve est complétée en arrière-plan pendant la partie
+
+    Raises
+    ------
+    ValueError
+        Si une cible est donnée avec un stock, ou une taille différente de celle du stock
+
+    """
+    if isinstance(cible, str) and cible.isdigit():
+        cible = int(cible)
+    if stock is not None and cible is not None:
+        raise ValueError("Le stock ne garde pas le niveau des puzzles : pas de cible avec --stock")
+    with contextlib.ExitStack() as pile:
+        if stock is not None:
+            from stockage import StockPuzzles
+            with StockPuzzles(stock) as puzzles:
+                if taille is not None and taille != puzzles.taille:
+                    raise ValueError(f"Le stock contient des grilles {puzzles.taille}x{puzzles.taille}, pas {taille}x{taille}")
+                grille_sudoku = puzzles.au_hasard(rd)
+        elif reserve is not None:
+            from reserve import ReservePuzzles
+            puzzles = pile.enter_context(ReservePuzzles(paniers=(cible,), bas=1, haut=5, taille=taille or 9,
+                                                        chemin=reserve))
+            grille_sudoku = puzzles.prendre(cible)
+            if grille_sudoku is None:
+                #Génération du panier en échec : on retente une fois ici, l'erreur éventuelle est alors visible
+                grille_sudoku = GenerateurSudoku(taille=taille or 9, cible=cible).generer_grille()
+        else:
+            generateur = GenerateurSudoku(taille=taille or 9, cible=cible)
+            grille_sudoku = generateur.generer_grille()
+        jouer(grille_sudoku)
+
+def jouer(grille_sudoku):
+    """
+    Boucle de jeu dans la console sur un puzzle
+
+    Parameters
+    ----------
+    grille_sudoku : Grille
+        Puzzle à jouer, avec sa solution
+
+    """
     jeu = Jeu(grille_sudoku.en_liste(), solution = grille_sudoku.solution, verif_solution=True)
     print('"q" pour quitter')
     print('"mode" pour regarder la vérification')
+    print('"auto" pour afficher les candidats de chaque case')
+    print('"indice" pour obtenir un indice')
+    print('"annuler" et "refaire" pour revenir sur un coup')
     print('"a Ligne Colonne Valeur" pour annoter')
     print('"Ligne Colonne Valeur" pour compléter')
     afficher_grille(jeu)
@@ -628,7 +3389,19 @@ def main():
         print("Trop fort ! Tié un tigre !!!")
 
 if __name__ == "__main__":
-    main()
+    if len(sys.argv) > 1 and sys.argv[1] == "lot":
+        main_lot(sys.argv[2:])
+    elif len(sys.argv) > 1 and sys.argv[1] == "rejouer":
+        main_rejouer(sys.argv[2:])
+    else:
+        analyseur = argparse.ArgumentParser(description="Jouer au sudoku dans la console")
+        analyseur.add_argument("--stock", default=None, help="stock de puzzles pré-générés (fichier .sdk)")
+        analyseur.add_argument("-t", "--taille", type=int, default=None,
+                               help="taille de la grille (9, 16, 25 ; par défaut 9, ou celle du stock)")
+        analyseur.add_argument("-c", "--cible", default=None, help="difficulté visée (facile, moyen, difficile, expert, diabolique)")
+        analyseur.add_argument("--reserve", default=None, help="réserve de puzzles prêts, gardée entre deux parties (fichier texte)")
+        options = analyseur.parse_args()
+        main(options.stock, options.taille, options.cible, options.reserve)
     # generateur = GenerateurSudoku()
     # grille_sudoku = generateur.generer_grille()
     
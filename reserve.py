@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+"""
+Réserve de puzzles prêts à jouer, remplie en arrière-plan.
+
+Chaque panier de difficulté (une cible de GenerateurSudoku : "facile", "moyen", ..., ou None pour
+la génération sans cible) est une file de puzzles déjà générés. Prendre un puzzle est immédiat ;
+quand un panier descend sous son seuil bas, des processus de travail le remplissent jusqu'au seuil
+haut, sans jamais bloquer celui qui prend les puzzles. À la fermeture, les puzzles restants sont
+écrits dans un fichier (format de corpus.py, précédé d'une ligne "# indice N" qui donne l'indice
+du prochain puzzle à générer) et rechargés au prochain démarrage : avec une graine fixe, la
+réserve reprend sa suite de puzzles au lieu de régénérer ceux qu'elle a déjà produits.
+Un panier dont les générations échouent (cible inatteignable pour la taille, par exemple) n'est
+plus relancé pendant un délai qui double à chaque échec consécutif, jusqu'à RECUL_MAX secondes.
+
+    with ReservePuzzles(chemin="reserve.txt") as reserve:
+        grille = reserve.prendre("moyen")
+"""
+
+import collections
+import concurrent.futures as cf
+import os
+import threading
+import time
+
+from main_propre import _generer_puzzle
+from corpus import lire_corpus, ecrire_corpus, _ouvrir
+
+
+class ReservePuzzles():
+    """
+    Files de puzzles prêts, une par panier de difficulté, remplies en arrière-plan
+
+    Attributs
+    ---------
+    files : dict
+        File (collections.deque) de puzzles prêts de chaque panier
+    bas : int
+        Seuil bas : en dessous, le panier est rempli
+    haut : int
+        Seuil haut : nombre de puzzles visé lors d'un remplissage
+    taille : int
+        Taille des grilles
+    chemin : str ou None
+        Fichier où les puzzles restants sont gardés entre deux exécutions
+
+    """
+    #Délai avant de relancer un panier après un échec (en secondes), doublé à chaque échec consécutif
+    RECUL = 1.0
+    RECUL_MAX = 60.0
+
+    def __init__(self, paniers=(None, "facile", "moyen", "difficile"), bas=10, haut=50, taille=9,
+                 processus=None, chemin=None, graine=None):
+        """
+        Crée la réserve, recharge les puzzles gardés et lance le remplissage des paniers
+
+        Parameters
+        ----------
+        paniers : tuple, optional
+            Cibles de difficulté (voir GenerateurSudoku), None pour la génération sans cible.
+            Par défaut : sans cible, "facile", "moyen" et "difficile"
+        bas : int, optional
+            Seuil bas de chaque panier. La valeur par défaut est 10
+        haut : int, optional
+            Seuil haut de chaque panier. La valeur par défaut est 50
+        taille : int, optional
+            Taille des grilles. La valeur par défaut est 9
+        processus : int, optional
+            Nombre de processus de génération. Par défaut, le nombre de cœurs
+        chemin : str, optional
+            Fichier des puzzles gardés. Par défaut, rien n'est gardé
+        graine : int, optional
+            Graine de la génération. Par défaut, tirée au hasard
+
+        Raises
+        ------
+        ValueError
+            Si les seuils sont incohérents
+
+        """
+        if not 0 <= bas <= haut or haut < 1:
+            raise ValueError(f"Seuils incohérents : bas = {bas}, haut = {haut} (attendu : 0 <= bas <= haut, haut >= 1)")
+        self.files = {panier: collections.deque() for panier in paniers}
+        self.bas = bas
+        self.haut = haut
+        self.taille = taille
+        self.chemin = chemin
+        self._graine = graine if graine is not None else int.from_bytes(os.urandom(8), "little")
+        #Indice du prochain puzzle généré (le puzzle d'indice i ne dépend que de la graine et de i)
+        self._indice = 0
+        self._en_cours = {panier: 0 for panier in paniers}
+        self._echecs = {panier: 0 for panier in paniers}
+        #Échecs consécutifs et instant (time.monotonic) avant lequel le panier n'est pas relancé
+        self._echecs_suite = {panier: 0 for panier in paniers}
+        self._reprise = {panier: 0.0 for panier in paniers}
+        self._condition = threading.Condition()
+        self._fermee = False
+        if chemin is not None and os.path.exists(chemin):
+            self._recharger()
+        self.executeur = cf.ProcessPoolExecutor(max_workers=processus or os.cpu_count() or 1)
+        self._a_remplir = threading.Event()
+        self._a_remplir.set()
+        self._fil = threading.Thread(target=self._remplissage, name="remplissage-reserve", daemon=True)
+        self._fil.start()
+
+    def __len__(self):
+        return sum(len(file) for file in self.files.values())
+
+    def disponibles(self, panier):
+        """
+        Nombre de puzzles prêts dans un panier
+
+        """
+        return len(self.files[panier])
+
+    def prendre(self, panier=None, delai=None):
+        """
+        Prend un puzzle prêt dans un panier (en O(1)) et signale au fil de remplissage
+        que le panier est peut-être passé sous son seuil bas
+
+        Parameters
+        ----------
+        panier : str, int ou None, optional
+            Panier de difficulté. Par défaut, celui de la génération sans cible
+        delai : float, optional
+            Si le panier est vide, temps maximal d'attente d'un puzzle en secondes (0 pour ne pas attendre).
+            Par défaut, on attend la fin de la génération en cours
+
+        Returns
+        -------
+        Grille ou None
+            Puzzle (avec sa solution), None si aucun n'est arrivé dans le délai, si sa génération a échoué
+            ou si le panier, vide, n'est pas relancé après des échecs (voir RECUL)
+
+        Raises
+        ------
+        KeyError
+            Si le panier n'existe pas
+
+        """
+        file = self.files[panier]
+        try:
+            #deque.popleft est atomique : pas besoin du verrou quand le panier n'est pas vide
+            return file.popleft()
+        except IndexError:
+            pass
+        finally:
+            self._a_remplir.set()
+        if delai == 0:
+            return None
+        with self._condition:
+            echecs = self._echecs[panier]
+            #Sans génération en cours ni relance possible (recul après des échecs), rien n'arrivera
+            self._condition.wait_for(lambda: file or self._fermee or self._echecs[panier] != echecs
+                                     or (not self._en_cours[panier] and time.monotonic() < self._reprise[panier]),
+                                     timeout=delai)
+            return file.popleft() if file else None
+
+    def _remplissage(self):
+        #Fil de remplissage : attend un signal de prendre, puis lance les générations manquantes
+        while True:
+            self._a_remplir.wait()
+            self._a_remplir.clear()
+            with self._condition:
+                if self._fermee:
+                    return
+                commandes = []
+                maintenant = time.monotonic()
+                for panier, file in self.files.items():
+                    #Hystérésis : on ne remplit qu'en dessous du seuil bas, mais jusqu'au seuil haut
+                    if len(file) + self._en_cours[panier] < max(self.bas, 1) and maintenant >= self._reprise[panier]:
+                        manquants = self.haut - len(file) - self._en_cours[panier]
+                        self._en_cours[panier] += manquants
+                        commandes.extend([panier] * manquants)
+            #Soumission hors du verrou : prendre n'attend jamais l'exécuteur
+            for panier in commandes:
+                try:
+                    tache = self.executeur.submit(_generer_puzzle, None, self._graine, self._indice,
+                                                  self.taille, panier)
+                except RuntimeError:
+                    #Exécuteur arrêté pendant la soumission
+                    return
+                self._indice += 1
+                tache.add_done_callback(lambda tache, panier=panier: self._terminee(panier, tache))
+
+    def _terminee(self, panier, tache):
+        #Rappel exécuté par le fil de gestion de l'exécuteur à la fin de chaque génération
+        with self._condition:
+            self._en_cours[panier] -= 1
+            if tache.cancelled():
+                pass
+            elif tache.exception() is None:
+                self.files[panier].append(tache.result()[2])
+                self._echecs_suite[panier] = 0
+                self._reprise[panier] = 0.0
+            else:
+                self._echecs[panier] += 1
+                self._echecs_suite[panier] += 1
+                recul = min(self.RECUL_MAX, self.RECUL * 2 ** min(self._echecs_suite[panier] - 1, 32))
+                self._reprise[panier] = time.monotonic() + recul
+            self._condition.notify_all()
+
+    def _recharger(self):
+        """
+        Recharge les puzzles gardés par fermer (ceux des paniers inconnus sont ignorés)
+        et l'indice du prochain puzzle à générer
+
+        """
+        paniers = {str(panier): panier for panier in self.files}
+        fichier, _ = _ouvrir(self.chemin, "rb")
+        with fichier:
+            entete = fichier.readline().split()
+            if len(entete) == 3 and entete[:2] == [b"#", b"indice"] and entete[2].isdigit():
+                self._indice = int(entete[2])
+            for grille, metadonnees in lire_corpus(fichier):
+                if len(metadonnees) != 3 or metadonnees[0] not in paniers or grille.taille != self.taille:
+                    continue
+                file = self.files[paniers[metadonnees[0]]]
+                if len(file) < self.haut:
+                    grille.difficulte, grille.niveau = (int(valeur) if valeur.isdigit() else None
+                                                        for valeur in metadonnees[1:])
+                    file.append(grille)
+
+    def fermer(self):
+        """
+        Arrête le remplissage (les générations déjà commencées sont attendues et gardées)
+        et écrit les puzzles restants dans le fichier de la réserve
+
+        """
+        with self._condition:
+            if self._fermee:
+                return
+            self._fermee = True
+            self._condition.notify_all()
+        self._a_remplir.set()
+        self._fil.join()
+        self.executeur.shutdown(wait=True, cancel_futures=True)
+        if self.chemin is None:
+            return
+        entrees = ((grille, (panier, grille.difficulte, grille.niveau))
+                   for panier, file in self.files.items() for grille in file)
+        #Écriture dans un fichier temporaire puis remplacement, pour ne jamais laisser une réserve à moitié écrite
+        temporaire = self.chemin + ".tmp"
+        fichier, _ = _ouvrir(temporaire, "wt")
+        with fichier:
+            fichier.write(f"# indice {self._indice}\n")
+            ecrire_corpus(fichier, entrees)
+        os.replace(temporaire, self.chemin)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *erreur):
+        self.fermer()
@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+"""
+Serveur de parties de sudoku (asyncio), pour héberger de nombreux joueurs dans un seul processus.
+
+Le protocole est textuel, une requête par ligne, une réponse JSON par ligne :
+    nouvelle [taille] [cible]       crée une partie (grille générée dans un processus de travail)
+    <session> <commande>            applique une commande du jeu (voir main_propre.executer_commande)
+    etat <session>                  grille courante de la partie
+    fermer <session>                supprime la partie
+Les parties vivent en mémoire, indépendamment des connexions : on peut reprendre une partie
+depuis une autre connexion avec son identifiant de session.
+
+Les coups prennent quelques microsecondes et sont traités directement dans la boucle ; la génération
+des grilles et les indices (le moteur de techniques peut prendre du temps sur une grande grille)
+partent dans des processus de travail, pour qu'une requête lente ne retarde jamais les coups des
+autres joueurs. Une génération qui dépasse delai_generation est abandonnée avec une erreur.
+Avec une réserve de puzzles (voir reserve.py), une nouvelle partie est servie immédiatement tant
+que le panier demandé n'est pas vide.
+
+    python serveur.py --port 8765 --reserve reserve.txt
+    python serveur.py --unix /tmp/sudoku.sock
+"""
+
+import argparse
+import asyncio
+import concurrent.futures as cf
+import itertools
+import json
+import os
+
+import numpy as np
+
+from main_propre import SYMBOLES, Jeu, executer_commande, chercher_indice, _generer_puzzle
+
+
+class ServeurSudoku():
+    """
+    Parties de sudoku en mémoire, servies par asyncio
+
+    Attributs
+    ---------
+    jeux : dict
+        Parties en cours, indexées par identifiant de session
+    maximum_sessions : int
+        Nombre maximal de parties gardées en mémoire
+    graine : int
+        Graine des grilles générées (la grille de la n-ième partie ne dépend que de la graine et de n)
+    executeur : concurrent.futures.Executor
+        Processus de travail pour la génération des grilles
+    executeur_indices : concurrent.futures.Executor
+        Processus de travail pour les indices, à part pour ne pas attendre derrière une génération
+    delai_generation : float
+        Durée maximale de la génération d'une grille, en secondes
+    reserve : ReservePuzzles ou None
+        Réserve de puzzles prêts, utilisée en priorité quand elle a le panier demandé
+
+    """
+    def __init__(self, processus=None, maximum_sessions=100000, graine=None, difficulte=None, reserve=None,
+                 delai_generation=30.0):
+        """
+        Initialise le serveur
+
+        Parameters
+        ----------
+        processus : int, optional
+            Nombre de processus de génération. Par défaut, le nombre de cœurs
+        maximum_sessions : int, optional
+            Nombre maximal de parties en mémoire. La valeur par défaut est 100000
+        graine : int, optional
+            Graine des grilles. Par défaut, tirée au hasard
+        difficulte : int, optional
+            Nombre de cases retirées. Par défaut, celui du générateur
+        reserve : ReservePuzzles, optional
+            Réserve de puzzles prêts (sa fermeture reste à la charge de l'appelant). Par défaut, aucune
+        delai_generation : float, optional
+            Durée maximale de la génération d'une grille, attente d'un processus libre comprise.
+            La valeur par défaut est 30 secondes
+
+        """
+        self.jeux = {}
+        self.maximum_sessions = maximum_sessions
+        self.graine = graine if graine is not None else int.from_bytes(os.urandom(8), "little")
+        self.difficulte = difficulte
+        self.reserve = reserve
+        processus = processus or os.cpu_count() or 1
+        self.executeur = cf.ProcessPoolExecutor(max_workers=processus)
+        self.executeur_indices = cf.ProcessPoolExecutor(max_workers=max(1, processus // 4))
+        self.delai_generation = delai_generation
+        self._compteur = itertools.count()
+        #Parties en cours de génération, comptées dans la limite de sessions
+        self._en_generation = 0
+
+    async def nouvelle_partie(self, taille=9, cible=None):
+        """
+        Prend une grille dans la réserve ou, à défaut, la génère dans un processus de travail,
+        et crée la partie correspondante
+
+        Parameters
+        ----------
+        taille : int, optional
+            Taille de la grille. La valeur par défaut est 9
+        cible : int ou str, optional
+            Difficulté visée (voir GenerateurSudoku). Par défaut, aucune
+
+        Returns
+        -------
+        dict
+            "session" (identifiant de la partie), "puzzle" (grille sur une ligne) et "taille"
+
+        Raises
+        ------
+        ValueError
+            Si le nombre maximal de parties est atteint
+        RuntimeError
+            Si la génération dépasse delai_generation (ou que la cible n'est pas atteinte)
+
+        """
+        if len(self.jeux) + self._en_generation >= self.maximum_sessions:
+            raise ValueError(f"Trop de parties en cours ({self.maximum_sessions} au maximum)")
+        indice = next(self._compteur)
+        grille = None
+        if self.reserve is not None and taille == self.reserve.taille and cible in self.reserve.files:
+            grille = self.reserve.prendre(cible, delai=0)
+        if grille is None:
+            boucle = asyncio.get_running_loop()
+            self._en_generation += 1
+            try:
+                #Le processus de travail s'arrête aussi de lui-même après le délai : il est libéré pour la suite
+                tache = boucle.run_in_executor(self.executeur, _generer_puzzle, self.difficulte, self.graine, indice,
+                                               taille, cible, "recherche", self.delai_generation)
+                _, _, grille = await asyncio.wait_for(tache, self.delai_generation)
+            except TimeoutError:
+                raise RuntimeError(f"Génération trop longue (plus de {self.delai_generation:g} s)") from None
+            finally:
+                self._en_generation -= 1
+        session = f"s{indice}"
+        self.jeux[session] = Jeu(grille.en_liste(), solution=grille.solution, verif_solution=True, verbeux=False)
+        return {"session": session, "puzzle": grille.en_chaine(), "taille": taille}
+
+    def etat(self, session):
+        """
+        Grille courante d'une partie
+
+        Returns
+        -------
+        dict
+            "session", "grille" (sur une ligne) et "complete"
+
+        """
+        jeu = self.jeux[session]
+        grille = "".join(SYMBOLES[valeur] for valeur in jeu.grille.grille.ravel())
+        return {"session": session, "grille": grille, "complete": jeu.est_complete()}
+
+    async def traiter(self, requete):
+        """
+        Traite une requête du protocole
+
+        Parameters
+        ----------
+        requete : str
+            Ligne reçue
+
+        Returns
+        -------
+        dict
+            Réponse, avec "ok" à False et "erreur" si la requête n'a pas pu être traitée
+
+        """
+        parties = requete.split()
+        if not parties:
+            return {"ok": False, "erreur": "Requête vide"}
+        verbe = parties[0].lower()
+        try:
+            if verbe == "nouvelle":
+                if len(parties) > 3:
+                    raise ValueError("Usage : nouvelle [taille] [cible]")
+                taille = int(parties[1]) if len(parties) > 1 else 9
+                cible = parties[2] if len(parties) > 2 else None
+                if cible is not None and cible.isdigit():
+                    cible = int(cible)
+                reponse = await self.nouvelle_partie(taille, cible)
+            elif verbe == "etat" and len(parties) == 2:
+                reponse = self.etat(parties[1])
+            elif verbe == "fermer" and len(parties) == 2:
+                del self.jeux[parties[1]]
+                reponse = {"session": parties[1]}
+            else:
+                session = parties[0]
+                jeu = self.jeux[session]
+                commande = requete.split(None, 1)[1] if len(parties) > 1 else ""
+                if commande.strip().lower() == "indice":
+                    #Indice calculé sur une copie de la grille, dans un processus de travail
+                    candidats = jeu.candidats.copy() if jeu.candidats_auto else None
+                    conseil = await asyncio.get_running_loop().run_in_executor(
+                        self.executeur_indices, chercher_indice, jeu.grille.grille.copy(), candidats)
+                    reponse = executer_commande(commande, jeu, conseil=conseil)
+                else:
+                    reponse = executer_commande(commande, jeu)
+                reponse["session"] = session
+                return reponse
+        except KeyError as erreur:
+            return {"ok": False, "erreur": f"Session inconnue : {erreur.args[0]}"}
+        except (ValueError, RuntimeError) as erreur:
+            return {"ok": False, "erreur": str(erreur)}
+        reponse["ok"] = True
+        return reponse
+
+    async def _servir(self, lecteur, ecrivain):
+        #Une tâche par connexion ; les requêtes d'une connexion sont traitées dans l'ordre
+        try:
+            while True:
+                try:
+                    ligne = await lecteur.readline()
+                except (ValueError, asyncio.LimitOverrunError):
+                    #Ligne plus longue que la limite du lecteur (64 Kio) : on répond, puis on ferme la connexion
+                    erreur = {"ok": False, "erreur": "Requête trop longue"}
+                    ecrivain.write(json.dumps(erreur, ensure_ascii=False).encode("utf-8") + b"\n")
+                    await ecrivain.drain()
+                    break
+                if not ligne:
+                    break
+                reponse = await self.traiter(ligne.decode("utf-8", errors="replace"))
+                ecrivain.write(json.dumps(reponse, ensure_ascii=False).encode("utf-8") + b"\n")
+                await ecrivain.drain()
+        except ConnectionError:
+            #Client parti
+            pass
+        finally:
+            #Une annulation (arrêt du serveur) est propagée après la fermeture de la connexion
+            ecrivain.close()
+
+    async def demarrer(self, hote="127.0.0.1", port=8765, chemin=None):
+        """
+        Ouvre le serveur (TCP, ou socket Unix si un chemin est donné)
+
+        Parameters
+        ----------
+        hote : str, optional
+            Adresse d'écoute TCP. La valeur par défaut est "127.0.0.1"
+        port : int, optional
+            Port TCP (0 pour un port libre choisi par le système). La valeur par défaut est 8765
+        chemin : str, optional
+            Chemin du socket Unix. Par défaut, le serveur écoute en TCP
+
+        Returns
+        -------
+        asyncio.Server
+            Serveur ouvert
+
+        """
+        if chemin is not None:
+            return await asyncio.start_unix_server(self._servir, path=chemin)
+        return await asyncio.start_server(self._servir, hote, port)
+
+    def fermer(self):
+        """
+        Arrête les processus de génération et d'indices
+
+        """
+        self.executeur.shutdown(cancel_futures=True)
+        self.executeur_indices.shutdown(cancel_futures=True)
+
+
+async def servir(hote, port, chemin, processus, graine, fichier_reserve=None):
+    graine_serveur = graine_reserve = None
+    if graine is not None:
+        #Deux suites de graines indépendantes : le serveur et la réserve ne produisent jamais les mêmes puzzles
+        graine_serveur, graine_reserve = (int(enfant.generate_state(1, np.uint64)[0])
+                                          for enfant in np.random.SeedSequence(graine).spawn(2))
+    reserve = None
+    if fichier_reserve is not None:
+        from reserve import ReservePuzzles
+        reserve = ReservePuzzles(processus=processus, chemin=fichier_reserve, graine=graine_reserve)
+    serveur = ServeurSudoku(processus=processus, graine=graine_serveur, reserve=reserve)
+    try:
+        async with await serveur.demarrer(hote, port, chemin) as ouvert:
+            adresses = ", ".join(str(socket.getsockname()) for socket in ouvert.sockets)
+            print(f"Serveur de sudoku à l'écoute sur {adresses}")
+            await ouvert.serve_forever()
+    finally:
+        serveur.fermer()
+        if reserve is not None:
+            reserve.fermer()
+
+
+if __name__ == "__main__":
+    analyseur = argparse.ArgumentParser(description="Serveur de parties de sudoku")
+    analyseur.add_argument("--hote", default="127.0.0.1", help="adresse d'écoute TCP")
+    analyseur.add_argument("--port", type=int, default=8765, help="port TCP")
+    analyseur.add_argument("--unix", default=None, help="chemin d'un socket Unix (à la place de TCP)")
+    analyseur.add_argument("-p", "--processus", type=int, default=None, help="nombre de processus de génération")
+    analyseur.add_argument("-g", "--graine", type=int, default=None, help="graine des grilles")
+    analyseur.add_argument("--reserve", default=None, help="réserve de puzzles prêts, gardée entre deux lancements")
+    options = analyseur.parse_args()
+    try:
+        asyncio.run(servir(options.hote, options.port, options.unix, options.processus, options.graine, options.reserve))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+"""
+Stockage binaire de puzzles en enregistrements de taille fixe, lu par mmap.
+
+Le fichier commence par un en-tête de 16 octets :
+    - signature b"SDKS" (4 octets)
+    - version du format (uint16)
+    - taille de la grille (uint8)
+    - nombre de bits par case (uint8, 4 pour les grilles jusqu'à 15x15, 8 au-delà)
+    - nombre d'enregistrements (uint64)
+puis les enregistrements, tous de même taille :
+    - cases de départ (0 = vide), empaquetées
+    - solution, empaquetée
+    - difficulté (uint16)
+    - graine (uint64)
+
+L'accès au puzzle n°i se fait en O(1), sans lire ni analyser le reste du fichier.
+
+Conversion d'un corpus texte (voir corpus.py) en stock :
+    python stockage.py puzzles.txt puzzles.sdk
+"""
+
+import itertools
+import mmap
+import struct
+import sys
+import numpy as np
+
+from main_propre import Grille
+
+
+SIGNATURE = b"SDKS"
+VERSION = 1
+_ENTETE = struct.Struct("<4sHBBQ")
+
+
+def _bits_par_case(taille):
+    return 4 if taille <= 15 else 8
+
+def type_enregistrement(taille):
+    """
+    Type NumPy d'un enregistrement pour une taille de grille donnée
+
+    Parameters
+    ----------
+    taille : int
+        Taille de la grille
+
+    Returns
+    -------
+    np.dtype
+        Type structuré (donnees, solution, difficulte, graine)
+
+    """
+    nb_cases = taille * taille
+    nb_octets = (nb_cases + 1) // 2 if _bits_par_case(taille) == 4 else nb_cases
+    return np.dtype([("donnees", np.uint8, (nb_octets,)), ("solution", np.uint8, (nb_octets,)),
+                     ("difficulte", "<u2"), ("graine", "<u8")])
+
+def empaqueter(valeurs, taille):
+    """
+    Empaquette les valeurs d'une grille (deux cases par octet si la taille le permet)
+
+    """
+    valeurs = np.asarray(valeurs, dtype=np.uint8).ravel()
+    if _bits_par_case(taille) == 8:
+        return valeurs
+    if len(valeurs) % 2:
+        valeurs = np.append(valeurs, np.uint8(0))
+    return (valeurs[0::2] << 4) | valeurs[1::2]
+
+def depaqueter(octets, taille):
+    """
+    Opération inverse de empaqueter
+
+    Returns
+    -------
+    np.ndarray
+        Tableau 2D (taille, taille) d'entiers non signés sur 8 bits
+
+    """
+    nb_cases = taille * taille
+    if _bits_par_case(taille) == 8:
+        return np.array(octets, dtype=np.uint8).reshape(taille, taille)
+    valeurs = np.empty(2 * len(octets), dtype=np.uint8)
+    valeurs[0::2] = octets >> 4
+    valeurs[1::2] = octets & 0x0F
+    return valeurs[:nb_cases].reshape(taille, taille)
+
+def ecrire_stock(chemin, entrees, taille=9):
+    """
+    Écrit un stock de puzzles, à la volée
+
+    Parameters
+    ----------
+    chemin : str
+        Fichier à créer
+    entrees : iterable
+        Grilles (avec leur solution), ou triplets (grille, difficulté, graine)
+    taille : int, optional
+        Taille des grilles. La valeur par défaut est 9
+
+    Returns
+    -------
+    int
+        Nombre de puzzles écrits
+
+    """
+    type_enr = type_enregistrement(taille)
+    enregistrement = np.zeros(1, dtype=type_enr)
+    nombre = 0
+    with open(chemin, "wb") as fichier:
+        fichier.write(_ENTETE.pack(SIGNATURE, VERSION, taille, _bits_par_case(taille), 0))
+        for entree in entrees:
+            grille, difficulte, graine = entree if isinstance(entree, tuple) else (entree, None, None)
+            if grille.taille != taille:
+                raise ValueError(f"Grille de taille {grille.taille} dans un stock de taille {taille}")
+            if grille.solution is None:
+                raise ValueError("Chaque puzzle du stock doit avoir une solution")
+            if difficulte is None:
+                difficulte = grille.difficulte if grille.difficulte is not None else int((grille.grille == 0).sum())
+            enregistrement["donnees"] = empaqueter(grille.grille, taille)
+            enregistrement["solution"] = empaqueter(grille.solution, taille)
+            enregistrement["difficulte"] = difficulte
+            enregistrement["graine"] = graine or 0
+            fichier.write(enregistrement.tobytes())
+            nombre += 1
+        fichier.seek(0)
+        fichier.write(_ENTETE.pack(SIGNATURE, VERSION, taille, _bits_par_case(taille), nombre))
+    return nombre
+
+
+
+class StockPuzzles():
+    """
+    Stock de puzzles ouvert en lecture par mmap, avec accès direct au puzzle n°i
+    
+    Attributs
+    ---------
+    chemin : str
+        Fichier du stock
+    taille : int
+        Taille des grilles
+    enregistrements : np.ndarray
+        Vue structurée (sans copie) sur les enregistrements du fichier
+    
+    """
+    def __init__(self, chemin):
+        """
+        Ouvre un stock existant
+
+        Parameters
+        ----------
+        chemin : str
+            Fichier du stock
+
+        Raises
+        ------
+        ValueError
+            Si le fichier n'est pas un stock de puzzles valide
+
+        """
+        self.chemin = chemin
+        self._fichier = open(chemin, "rb")
+        self._carte = None
+        try:
+            self._carte = mmap.mmap(self._fichier.fileno(), 0, access=mmap.ACCESS_READ)
+            if len(self._carte) < _ENTETE.size:
+                raise ValueError(f"{chemin} n'est pas un stock de puzzles valide (en-tête tronqué)")
+            signature, version, taille, bits, nombre = _ENTETE.unpack_from(self._carte, 0)
+            if signature != SIGNATURE or version != VERSION or bits != _bits_par_case(taille):
+                raise ValueError(f"{chemin} n'est pas un stock de puzzles valide (version {VERSION})")
+            self.taille = taille
+            self.enregistrements = np.frombuffer(self._carte, dtype=type_enregistrement(taille),
+                                                 count=nombre, offset=_ENTETE.size)
+        except BaseException:
+            #Stock invalide ou tronqué : rien ne doit rester ouvert
+            if self._carte is not None:
+                self._carte.close()
+            self._fichier.close()
+            raise
+    
+    def __len__(self):
+        return len(self.enregistrements)
+    
+    def __getitem__(self, indice):
+        """
+        Lit le puzzle n°indice
+
+        Returns
+        -------
+        Grille
+            Grille de départ (cases non-nulles bloquées), avec sa solution et sa difficulté
+
+        """
+        enregistrement = self.enregistrements[indice]
+        grille = Grille.depuis_tableau(depaqueter(enregistrement["donnees"], self.taille))
+        grille.solution = depaqueter(enregistrement["solution"], self.taille)
+        grille.difficulte = int(enregistrement["difficulte"])
+        return grille
+    
+    def graine(self, indice):
+        """
+        Graine ayant servi à générer le puzzle n°indice
+
+        """
+        return int(self.enregistrements[indice]["graine"])
+    
+    def au_hasard(self, aleatoire):
+        """
+        Tire un puzzle au hasard
+
+        Parameters
+        ----------
+        aleatoire : random.Random ou module random
+            Générateur de nombres aléatoires
+
+        Returns
+        -------
+        Grille
+            Puzzle tiré
+
+        """
+        if not len(self):
+            raise IndexError("Le stock est vide")
+        return self[aleatoire.randrange(len(self))]
+    
+    def fermer(self):
+        """
+        Libère la projection mémoire et ferme le fichier
+
+        """
+        self.enregistrements = None
+        self._carte.close()
+        self._fichier.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.fermer()
+
+
+def _entrees_corpus(chemin):
+    #Convertit les métadonnées "difficulte graine" écrites par "main_propre.py lot"
+    from corpus import lire_corpus
+    for grille, metadonnees in lire_corpus(chemin):
+        champs = [int(valeur) if valeur.isdigit() else None for valeur in metadonnees[:2]]
+        champs += [None] * (2 - len(champs))
+        yield grille, champs[0], champs[1]
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage : python stockage.py corpus.txt stock.sdk")
+        sys.exit(1)
+    #La taille du stock est celle de la première grille du corpus
+    entrees = _entrees_corpus(sys.argv[1])
+    premiere = next(entrees, None)
+    taille = premiere[0].taille if premiere is not None else 9
+    entrees = itertools.chain([premiere] if premiere is not None else [], entrees)
+    print(f"{ecrire_stock(sys.argv[2], entrees, taille)} puzzles écrits dans {sys.argv[2]}")
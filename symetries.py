@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+Multiplication de puzzles par transformations de symétrie.
+
+Un puzzle à solution unique le reste (avec la même difficulté) si on lui applique :
+    - un renommage des chiffres
+    - une permutation des lignes à l'intérieur de chaque bande, et des colonnes à l'intérieur de chaque pile
+    - une permutation des bandes et une permutation des piles
+    - une transposition
+Aucune vérification d'unicité n'est donc nécessaire : à partir d'un seul puzzle généré, on obtient
+jusqu'à 2 x 9! x 6^8 (environ 1,2 x 10^12) grilles d'apparence différente pour un sudoku 9x9,
+en quelques microsecondes chacune.
+
+Les transformations sont tirées et appliquées par lots avec NumPy :
+    python symetries.py puzzles.txt 1000 derives.txt
+"""
+
+import math
+import sys
+import numpy as np
+
+from main_propre import Grille
+
+
+def nombre_transformations(taille=9):
+    """
+    Nombre de transformations distinctes pour une taille de grille
+
+    Parameters
+    ----------
+    taille : int, optional
+        Taille de la grille. La valeur par défaut est 9
+
+    Returns
+    -------
+    int
+        Nombre de combinaisons (renommage, permutations, transposition)
+
+    """
+    n = math.isqrt(taille)
+    return 2 * math.factorial(taille) * math.factorial(n) ** (2 * n + 2)
+
+def _permutations_par_blocs(rng, nombre, taille):
+    #Permutation des blocs (bandes ou piles) puis des lignes à l'intérieur de chaque bloc
+    n = math.isqrt(taille)
+    blocs = np.argsort(rng.random((nombre, n)), axis=1)
+    internes = np.argsort(rng.random((nombre, n, n)), axis=2)
+    return (blocs[:, :, None] * n + internes).reshape(nombre, taille)
+
+def tirer_transformations(rng, nombre, taille=9):
+    """
+    Tire des transformations de symétrie au hasard
+
+    Parameters
+    ----------
+    rng : np.random.Generator
+        Générateur de nombres aléatoires
+    nombre : int
+        Nombre de transformations à tirer
+    taille : int, optional
+        Taille de la grille. La valeur par défaut est 9
+
+    Returns
+    -------
+    dict
+        Tableaux "lignes" et "colonnes" (nombre, taille) : ordre des lignes et des colonnes,
+        "chiffres" (nombre, taille + 1) : nouveau nom de chaque chiffre (0 reste 0),
+        "transposer" (nombre,) : transposition ou non
+
+    """
+    chiffres = np.zeros((nombre, taille + 1), dtype=np.uint8)
+    chiffres[:, 1:] = np.argsort(rng.random((nombre, taille)), axis=1) + 1
+    return {
+        "lignes": _permutations_par_blocs(rng, nombre, taille),
+        "colonnes": _permutations_par_blocs(rng, nombre, taille),
+        "chiffres": chiffres,
+        "transposer": rng.random(nombre) < 0.5,
+    }
+
+def appliquer(valeurs, transformations):
+    """
+    Applique des transformations à une grille
+
+    Parameters
+    ----------
+    valeurs : np.ndarray
+        Grille (taille, taille), 0 pour les cases vides
+    transformations : dict
+        Transformations tirées par tirer_transformations
+
+    Returns
+    -------
+    np.ndarray
+        Grilles transformées, de forme (nombre, taille, taille)
+
+    """
+    nombre, taille = transformations["lignes"].shape
+    grilles = np.asarray(valeurs)[transformations["lignes"][:, :, None], transformations["colonnes"][:, None, :]]
+    transposer = transformations["transposer"]
+    grilles[transposer] = grilles[transposer].transpose(0, 2, 1)
+    grilles = np.take_along_axis(transformations["chiffres"], grilles.reshape(nombre, -1), axis=1)
+    return grilles.reshape(nombre, taille, taille)
+
+
+class MultiplicateurPuzzles():
+    """
+    Dérive de nouveaux puzzles d'un puzzle source dont l'unicité a déjà été vérifiée
+
+    Attributs
+    ---------
+    source : Grille
+        Puzzle source (avec sa solution dans source.solution si elle est connue)
+    rng : np.random.Generator
+        Générateur de nombres aléatoires
+
+    """
+    def __init__(self, source, graine=None):
+        """
+        Initialise le multiplicateur
+
+        Parameters
+        ----------
+        source : Grille
+            Puzzle source, à solution unique
+        graine : int, optional
+            Graine des transformations. Par défaut, les transformations ne sont pas reproductibles
+
+        """
+        self.source = source
+        self.rng = np.random.default_rng(graine)
+
+    def deriver_lot(self, nombre):
+        """
+        Dérive un lot de puzzles sous forme de tableaux
+
+        Parameters
+        ----------
+        nombre : int
+            Nombre de puzzles à dériver
+
+        Returns
+        -------
+        tuple(np.ndarray, np.ndarray ou None)
+            Puzzles (nombre, taille, taille) et leurs solutions (None si la solution source est inconnue)
+
+        """
+        transformations = tirer_transformations(self.rng, nombre, self.source.taille)
+        puzzles = appliquer(self.source.grille, transformations)
+        solutions = None
+        if self.source.solution is not None:
+            solutions = appliquer(self.source.solution, transformations)
+        return puzzles, solutions
+
+    def deriver(self, nombre=1):
+        """
+        Dérive des puzzles sous forme de grilles
+
+        Parameters
+        ----------
+        nombre : int, optional
+            Nombre de puzzles à dériver. La valeur par défaut est 1
+
+        Yields
+        ------
+        Grille
+            Puzzle dérivé, avec sa solution et la difficulté du puzzle source
+
+        """
+        puzzles, solutions = self.deriver_lot(nombre)
+        for indice in range(nombre):
+            grille = Grille.depuis_tableau(puzzles[indice])
+            if solutions is not None:
+                grille.solution = solutions[indice]
+            grille.difficulte = self.source.difficulte
+            yield grille
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4:
+        print("Usage : python symetries.py puzzles.txt nombre_par_puzzle derives.txt")
+        sys.exit(1)
+    from corpus import lire_corpus, ecrire_corpus
+    nombre = int(sys.argv[2])
+    entrees = ((derive, metadonnees)
+               for source, metadonnees in lire_corpus(sys.argv[1])
+               for derive in MultiplicateurPuzzles(source).deriver(nombre))
+    print(f"{ecrire_corpus(sys.argv[3], entrees)} puzzles écrits dans {sys.argv[3]}")
@@ -0,0 +1,365 @@
+# -*- coding: utf-8 -*-
+"""
+Évaluation de la difficulté d'un puzzle par les techniques de résolution humaines.
+
+Le puzzle est résolu pas à pas en appliquant toujours la technique la plus simple qui fait
+progresser la grille ; sa difficulté est le niveau de la technique la plus difficile utilisée.
+Un puzzle qu'aucune de ces techniques ne suffit à résoudre demande de la "recherche" (essais et erreurs).
+
+Les candidats de chaque case sont des masques de bits (le bit i est à 1 si le chiffre i est possible),
+comme les masques de chiffres de Grille.
+"""
+
+import itertools
+import math
+import numpy as np
+
+
+#Techniques, de la plus simple à la plus difficile : le niveau d'une technique est son rang (à partir de 1)
+TECHNIQUES = ("singleton_cache", "singleton_nu", "pointage", "paire_nue", "paire_cachee",
+              "triplet_nu", "triplet_cache", "x_wing", "swordfish")
+RECHERCHE = "recherche"
+NIVEAUX = {technique: niveau for niveau, technique in enumerate(TECHNIQUES + (RECHERCHE,), 1)}
+#Catégorie d'un puzzle selon le niveau maximal de ses techniques
+CATEGORIES = ((2, "facile"), (3, "moyen"), (7, "difficile"), (9, "expert"), (10, "diabolique"))
+
+_STRUCTURES = {}
+
+
+def intervalle(cible):
+    """
+    Convertit une cible de difficulté en intervalle de niveaux
+
+    Parameters
+    ----------
+    cible : int ou str
+        Niveau, nom de technique ("x_wing", ...) ou de catégorie ("difficile", ...)
+
+    Returns
+    -------
+    tuple(int, int)
+        Niveaux minimal et maximal (1 = singleton caché, ..., 10 = recherche)
+
+    Raises
+    ------
+    ValueError
+        Si la cible est inconnue
+
+    """
+    if isinstance(cible, str):
+        if cible in NIVEAUX:
+            return NIVEAUX[cible], NIVEAUX[cible]
+        minimum = 1
+        for maximum, nom in CATEGORIES:
+            if nom == cible:
+                return minimum, maximum
+            minimum = maximum + 1
+        raise ValueError(f"Technique ou catégorie inconnue : {cible}")
+    if not 1 <= cible <= NIVEAUX[RECHERCHE]:
+        raise ValueError(f"Le niveau doit être compris entre 1 et {NIVEAUX[RECHERCHE]} (reçu : {cible})")
+    return cible, cible
+
+def _structure(taille):
+    #Unités (lignes, puis colonnes, puis carrés), unités de chaque case et voisins de chaque case,
+    #mises en cache par taille
+    if taille not in _STRUCTURES:
+        n = math.isqrt(taille)
+        unites = ([[ligne * taille + colonne for colonne in range(taille)] for ligne in range(taille)]
+                  + [[ligne * taille + colonne for ligne in range(taille)] for colonne in range(taille)]
+                  + [[(n * (carre // n) + i // n) * taille + n * (carre % n) + i % n for i in range(taille)]
+                     for carre in range(taille)])
+        unites_de = [[] for i in range(taille * taille)]
+        for indice, unite in enumerate(unites):
+            for case in unite:
+                unites_de[case].append(indice)
+        voisins = [sorted(set(itertools.chain.from_iterable(unites[u] for u in unites_de[case])) - {case})
+                   for case in range(taille * taille)]
+        _STRUCTURES[taille] = (unites, unites_de, voisins)
+    return _STRUCTURES[taille]
+
+def categorie(niveau_technique):
+    """
+    Catégorie ("facile", "moyen", "difficile", "expert" ou "diabolique") d'un niveau de technique
+
+    """
+    for maximum, nom in CATEGORIES:
+        if niveau_technique <= maximum:
+            return nom
+    return CATEGORIES[-1][1]
+
+
+class EvaluateurTechniques():
+    """
+    Résout un puzzle pas à pas avec des techniques humaines pour en évaluer la difficulté
+
+    Attributs
+    ---------
+    taille : int
+        Taille de la grille
+    valeurs : list[int]
+        Valeurs de la grille, à plat (0 = case vide)
+    candidats : list[int]
+        Masque des candidats de chaque case (0 pour une case remplie)
+    utilisations : dict
+        Nombre d'utilisations de chaque technique
+
+    """
+    def __init__(self, valeurs, candidats=None):
+        """
+        Initialise l'évaluateur à partir d'une grille
+
+        Parameters
+        ----------
+        valeurs : np.ndarray
+            Grille (taille, taille), 0 pour les cases vides
+        candidats : array-like, optional
+            Masques des candidats déjà connus (taille, taille), 0 pour les cases remplies.
+            Par défaut, ils sont calculés à partir de la grille
+
+        """
+        valeurs = np.asarray(valeurs)
+        self.taille = taille = len(valeurs)
+        self.valeurs = valeurs.ravel().tolist()
+        self._plein = (1 << (taille + 1)) - 2
+        self.unites, self._unites_de, self._voisins = _structure(taille)
+        self.utilisations = {technique: 0 for technique in TECHNIQUES}
+        if candidats is not None:
+            self.candidats = np.asarray(candidats).ravel().tolist()
+            return
+        self.candidats = [0] * (taille * taille)
+        for case, valeur in enumerate(self.valeurs):
+            if valeur == 0:
+                presents = 0
+                for voisin in self._voisins[case]:
+                    presents |= 1 << self.valeurs[voisin]
+                self.candidats[case] = self._plein & ~presents
+
+    def _placer(self, case, chiffre):
+        self.valeurs[case] = chiffre
+        self.candidats[case] = 0
+        bit = ~(1 << chiffre)
+        for voisin in self._voisins[case]:
+            self.candidats[voisin] &= bit
+
+    def appliquer(self, etape):
+        """
+        Applique une étape trouvée par prochaine_etape
+
+        Parameters
+        ----------
+        etape : tuple(str, list, list)
+            Technique, placements [(case, chiffre)] et éliminations [(case, masque à retirer)]
+
+        """
+        technique, placements, eliminations = etape
+        for case, chiffre in placements:
+            if self.valeurs[case] == 0:
+                self._placer(case, chiffre)
+        for case, masque in eliminations:
+            self.candidats[case] &= ~masque
+        self.utilisations[technique] += 1
+
+    def prochaine_etape(self, limite=None):
+        """
+        Cherche la prochaine déduction, avec la technique la plus simple possible
+
+        Parameters
+        ----------
+        limite : int, optional
+            Niveau maximal des techniques essayées. Par défaut, toutes
+
+        Returns
+        -------
+        tuple(str, list, list) ou None
+            Technique, placements [(case, chiffre)] et éliminations [(case, masque à retirer)],
+            ou None si aucune technique (jusqu'à la limite) ne fait progresser la grille
+
+        """
+        for technique in TECHNIQUES[:limite]:
+            resultat = getattr(self, "_" + technique)()
+            if resultat:
+                placements, eliminations = resultat
+                return technique, placements, eliminations
+        return None
+
+    def evaluer(self, limite=None):
+        """
+        Résout la grille pas à pas et mesure sa difficulté
+
+        Parameters
+        ----------
+        limite : int, optional
+            Niveau maximal des techniques essayées. Au-delà, l'évaluation s'arrête et le puzzle est
+            classé au niveau limite + 1 (permet de rejeter tôt un puzzle trop difficile)
+
+        Returns
+        -------
+        dict
+            "niveau" (niveau de la technique la plus difficile utilisée), "technique" (son nom),
+            "categorie" (catégorie du puzzle : "facile", ..., "diabolique"),
+            "resolu" (grille résolue par les techniques), "utilisations" (nombre d'utilisations de chaque technique).
+            Une grille sans solution n'est jamais résolue : elle est classée au niveau "recherche"
+
+        """
+        maximum = 0
+        while 0 in self.valeurs:
+            etape = self.prochaine_etape(limite)
+            if etape is None:
+                break
+            maximum = max(maximum, NIVEAUX[etape[0]])
+            self.appliquer(etape)
+        resolu = 0 not in self.valeurs
+        if not resolu:
+            maximum = NIVEAUX[RECHERCHE] if limite is None or limite >= len(TECHNIQUES) else limite + 1
+        noms = TECHNIQUES + (RECHERCHE,)
+        return {"niveau": maximum, "technique": noms[maximum - 1] if maximum else None,
+                "categorie": categorie(maximum) if maximum else None, "resolu": resolu, "utilisations": dict(self.utilisations)}
+
+    #####   Techniques #####
+    #Chacune rend (placements, éliminations) si elle fait progresser la grille, None sinon
+
+    def _positions(self, unite, bit):
+        return [case for case in unite if self.candidats[case] & bit]
+
+    def _singleton_cache(self):
+        candidats = self.candidats
+        for unite in self.unites:
+            une_fois = plusieurs_fois = 0
+            for case in unite:
+                plusieurs_fois |= une_fois & candidats[case]
+                une_fois |= candidats[case]
+            uniques = une_fois & ~plusieurs_fois
+            if uniques:
+                bit = uniques & -uniques
+                case = self._positions(unite, bit)[0]
+                return [(case, bit.bit_length() - 1)], []
+        return None
+
+    def _singleton_nu(self):
+        for case, masque in enumerate(self.candidats):
+            if masque and not masque & (masque - 1):
+                return [(case, masque.bit_length() - 1)], []
+        return None
+
+    def _pointage(self):
+        #Les places d'un chiffre dans une unité sont toutes dans une autre unité (carré et ligne/colonne) :
+        #le chiffre est éliminé du reste de cette autre unité
+        for indice, unite in enumerate(self.unites):
+            for chiffre in range(1, self.taille + 1):
+                bit = 1 << chiffre
+                positions = self._positions(unite, bit)
+                if len(positions) < 2:
+                    continue
+                communes = set(self._unites_de[positions[0]])
+                for case in positions[1:]:
+                    communes &= set(self._unites_de[case])
+                communes.discard(indice)
+                for autre in communes:
+                    eliminations = [(case, bit) for case in self.unites[autre]
+                                    if case not in positions and self.candidats[case] & bit]
+                    if eliminations:
+                        return [], eliminations
+        return None
+
+    def _sous_ensemble_nu(self, taille_ensemble):
+        #k cases d'une unité dont les candidats tiennent en k chiffres : ces chiffres sont éliminés des autres cases
+        for unite in self.unites:
+            cases = [case for case in unite if self.candidats[case]
+                     and bin(self.candidats[case]).count("1") <= taille_ensemble]
+            for ensemble in itertools.combinations(cases, taille_ensemble):
+                masque = 0
+                for case in ensemble:
+                    masque |= self.candidats[case]
+                if bin(masque).count("1") != taille_ensemble:
+                    continue
+                eliminations = [(case, masque) for case in unite
+                                if case not in ensemble and self.candidats[case] & masque]
+                if eliminations:
+                    return [], eliminations
+        return None
+
+    def _sous_ensemble_cache(self, taille_ensemble):
+        #k chiffres d'une unité qui ne peuvent aller que dans k cases : les autres candidats de ces cases sont éliminés
+        for unite in self.unites:
+            places = {}
+            for chiffre in range(1, self.taille + 1):
+                positions = self._positions(unite, 1 << chiffre)
+                if 2 <= len(positions) <= taille_ensemble:
+                    places[chiffre] = positions
+            for chiffres in itertools.combinations(places, taille_ensemble):
+                cases = set()
+                for chiffre in chiffres:
+                    cases.update(places[chiffre])
+                if len(cases) != taille_ensemble:
+                    continue
+                garder = sum(1 << chiffre for chiffre in chiffres)
+                eliminations = [(case, self.candidats[case] & ~garder) for case in cases
+                                if self.candidats[case] & ~garder]
+                if eliminations:
+                    return [], eliminations
+        return None
+
+    def _poisson(self, taille_ensemble):
+        #X-wing (2) et swordfish (3) : les places d'un chiffre dans k lignes tiennent dans k colonnes
+        #(ou l'inverse), le chiffre est éliminé du reste de ces colonnes
+        taille = self.taille
+        for chiffre in range(1, taille + 1):
+            bit = 1 << chiffre
+            for base, couverture in ((0, taille), (taille, 0)):
+                places = {}
+                for indice in range(taille):
+                    positions = self._positions(self.unites[base + indice], bit)
+                    if 2 <= len(positions) <= taille_ensemble:
+                        #Indice de la ligne de couverture de chaque place
+                        places[indice] = {(case % taille) if base == 0 else (case // taille) for case in positions}
+                for lignes in itertools.combinations(places, taille_ensemble):
+                    colonnes = set().union(*(places[ligne] for ligne in lignes))
+                    if len(colonnes) != taille_ensemble:
+                        continue
+                    eliminations = []
+                    for colonne in colonnes:
+                        for case in self.unites[couverture + colonne]:
+                            ligne = case // taille if base == 0 else case % taille
+                            if ligne not in lignes and self.candidats[case] & bit:
+                                eliminations.append((case, bit))
+                    if eliminations:
+                        return [], eliminations
+        return None
+
+    def _paire_nue(self):
+        return self._sous_ensemble_nu(2)
+
+    def _paire_cachee(self):
+        return self._sous_ensemble_cache(2)
+
+    def _triplet_nu(self):
+        return self._sous_ensemble_nu(3)
+
+    def _triplet_cache(self):
+        return self._sous_ensemble_cache(3)
+
+    def _x_wing(self):
+        return self._poisson(2)
+
+    def _swordfish(self):
+        return self._poisson(3)
+
+
+def evaluer(valeurs, limite=None):
+    """
+    Évalue la difficulté d'un puzzle (voir EvaluateurTechniques.evaluer)
+
+    Parameters
+    ----------
+    valeurs : np.ndarray
+        Grille (taille, taille), 0 pour les cases vides
+    limite : int, optional
+        Niveau maximal des techniques essayées
+
+    Returns
+    -------
+    dict
+        Niveau, technique la plus difficile, grille résolue ou non, et utilisations de chaque technique
+
+    """
+    return EvaluateurTechniques(valeurs).evaluer(limite)